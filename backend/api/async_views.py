@@ -0,0 +1,257 @@
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import Page
+from django.db import close_old_connections
+from django.db.models import BooleanField, Value
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django_filters.utils import translate_validation
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+from .fast import follower_dict, recipe_dict
+from .filters import RecipeFilter
+from .pagination import CachedCountPaginator, RecipePagination, UserPagination
+from .payloads import ensure_payload, recipe_etag
+from .renderers import FastJSONRenderer
+from .serializers import get_recipes_limit
+
+db_pool = ThreadPoolExecutor(
+    settings.ASYNC_DB_POOL_SIZE, thread_name_prefix='db'
+)
+
+
+def release_connections(func):
+    @wraps(func)
+    def wrapper(*args):
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return wrapper
+
+
+def in_pool(func, *args):
+    return sync_to_async(
+        release_connections(func), thread_sensitive=False, executor=db_pool
+    )(*args)
+
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status,
+        content_type='application/json',
+        headers={'Vary': 'Accept', **(headers or {})},
+    )
+
+
+def make_request(request):
+    return Request(
+        request,
+        authenticators=[
+            authentication()
+            for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    )
+
+
+def accepts_json(request):
+    return 'format' not in request.GET and 'text/html' not in (
+        request.headers.get('Accept', '')
+    )
+
+
+def uses_cursor(request):
+    return 'cursor' in request.GET
+
+
+def has_query(request):
+    return bool(request.GET)
+
+
+def async_read(view, fallback, use_fallback=None):
+    sync_view = sync_to_async(fallback)
+
+    async def dispatch(request, *args, **kwargs):
+        if (
+            request.method != 'GET'
+            or not accepts_json(request)
+            or (use_fallback is not None and use_fallback(request))
+        ):
+            return await sync_view(request, *args, **kwargs)
+        try:
+            return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            headers = {}
+            if isinstance(
+                exc,
+                (exceptions.NotAuthenticated, exceptions.AuthenticationFailed),
+            ):
+                headers['WWW-Authenticate'] = 'Token'
+            return json_response(
+                {'detail': exc.detail}
+                if isinstance(exc.detail, str)
+                else exc.detail,
+                exc.status_code,
+                headers,
+            )
+
+    dispatch.csrf_exempt = True
+    return dispatch
+
+
+def offloaded(view):
+    async def dispatch(request, *args, **kwargs):
+        return await in_pool(partial(view, request, *args, **kwargs))
+
+    dispatch.csrf_exempt = True
+    return dispatch
+
+
+def id_set(values):
+    return set(values)
+
+
+async def flag_sets(user, recipe_ids=None):
+    if not user.is_authenticated:
+        return set(), set(), set()
+    favorited = Favorite.objects.filter(user=user).order_by()
+    in_cart = ShoppingCart.objects.filter(user=user).order_by()
+    following = Follow.objects.filter(user=user).order_by()
+    if recipe_ids is not None:
+        favorited = favorited.filter(recipe__in=recipe_ids)
+        in_cart = in_cart.filter(recipe__in=recipe_ids)
+        following = following.filter(following__recipes__in=recipe_ids)
+    return await asyncio.gather(
+        in_pool(id_set, favorited.values_list('recipe_id', flat=True)),
+        in_pool(id_set, in_cart.values_list('recipe_id', flat=True)),
+        in_pool(id_set, following.values_list('following_id', flat=True)),
+    )
+
+
+def set_flags(recipes, favorited, in_cart, following):
+    for recipe in recipes:
+        recipe.is_favorited = recipe.id in favorited
+        recipe.is_in_shopping_cart = recipe.id in in_cart
+        recipe.is_author_subscribed = recipe.author_id in following
+
+
+async def paginate(pagination, request, queryset, *lookups):
+    paginator = CachedCountPaginator(
+        queryset, pagination.get_page_size(request)
+    )
+    number = request.query_params.get(pagination.page_query_param) or 1
+    if number in pagination.last_page_strings:
+        number = await in_pool(getattr, paginator, 'num_pages')
+    try:
+        number = int(number)
+    except (TypeError, ValueError):
+        number = 0
+    if number < 1:
+        for lookup in lookups:
+            lookup.close()
+        raise exceptions.NotFound(pagination.invalid_page_message)
+    offset = (number - 1) * paginator.per_page
+    _, rows, *results = await asyncio.gather(
+        in_pool(getattr, paginator, 'count'),
+        in_pool(list, queryset[offset:offset + paginator.per_page]),
+        *lookups,
+    )
+    if number > paginator.num_pages:
+        raise exceptions.NotFound(pagination.invalid_page_message)
+    pagination.page = Page(rows, number, paginator)
+    pagination.request = request
+    pagination.keyset = None
+    return rows, results
+
+
+async def recipe_list(request):
+    drf_request = make_request(request)
+    filterset = RecipeFilter(
+        request.GET, queryset=Recipe.objects.all(), request=drf_request
+    )
+    user, valid = await asyncio.gather(
+        in_pool(getattr, drf_request, 'user'),
+        in_pool(filterset.is_valid),
+    )
+    if not valid:
+        raise translate_validation(filterset.errors)
+    pagination = RecipePagination()
+    recipes, (flags,) = await paginate(
+        pagination,
+        drf_request,
+        filterset.qs.with_related(),
+        flag_sets(user),
+    )
+    set_flags(recipes, *flags)
+    return json_response(
+        pagination.get_paginated_response(
+            [recipe_dict(recipe, request) for recipe in recipes]
+        ).data
+    )
+
+
+async def recipe_detail(request, pk):
+    drf_request = make_request(request)
+    user = await in_pool(getattr, drf_request, 'user')
+    queryset = Recipe.objects.with_related()
+    if settings.RECIPE_PAYLOADS_ENABLED:
+        queryset = Recipe.objects.with_payload()
+    recipes, flags = await asyncio.gather(
+        in_pool(list, queryset.filter(pk=pk)),
+        flag_sets(user, [pk]),
+    )
+    if not recipes:
+        raise exceptions.NotFound
+    set_flags(recipes, *flags)
+    recipe = recipes[0]
+    if not settings.RECIPE_PAYLOADS_ENABLED:
+        return json_response(recipe_dict(recipe, request))
+    etag = recipe_etag(recipe)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = json_response(
+            recipe_dict(recipe, request, await in_pool(ensure_payload, recipe))
+        )
+    response['ETag'] = etag
+    return response
+
+
+async def subscriptions(request):
+    drf_request = make_request(request)
+    user = await in_pool(getattr, drf_request, 'user')
+    if not user.is_authenticated:
+        raise exceptions.NotAuthenticated
+    recipes_limit = get_recipes_limit(drf_request)
+    pagination = UserPagination()
+    authors, _ = await paginate(
+        pagination,
+        drf_request,
+        User.objects.filter(following__user=user)
+        .annotate(is_subscribed=Value(True, output_field=BooleanField()))
+        .order_by('username'),
+    )
+    previews = defaultdict(list)
+    for recipe in await in_pool(
+        list,
+        Recipe.objects.previews_for_authors(authors, recipes_limit),
+    ):
+        previews[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recipe_previews = previews[author.id]
+    return json_response(
+        pagination.get_paginated_response(
+            [follower_dict(author) for author in authors]
+        ).data
+    )
@@ -0,0 +1,88 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+
+from .cache import LocalLRU
+
+local_tokens = LocalLRU(settings.AUTH_TOKEN_CACHE_SIZE)
+
+# The password hash and the counters stay out of caches and are loaded
+# on access, so a save() from a cached user never writes stale values.
+SNAPSHOT_FIELDS = [
+    field.attname
+    for field in User._meta.concrete_fields
+    if field.attname != 'password'
+    and field.name not in User.derived_fields
+]
+
+
+def shared_tokens():
+    if settings.AUTH_TOKEN_CACHE_ALIAS is None:
+        return None
+    return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+
+
+def token_cache_key(key):
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def set_local(cache_key, snapshot):
+    local_tokens.set(
+        cache_key,
+        (time.monotonic() + settings.AUTH_TOKEN_LOCAL_TIMEOUT, snapshot),
+    )
+
+
+def get_snapshot(cache_key):
+    entry = local_tokens.get(cache_key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    shared = shared_tokens()
+    if shared is None:
+        return None
+    snapshot = shared.get(cache_key)
+    if snapshot is not None:
+        set_local(cache_key, snapshot)
+    return snapshot
+
+
+def set_snapshot(cache_key, snapshot):
+    set_local(cache_key, snapshot)
+    shared = shared_tokens()
+    if shared is not None:
+        shared.set(cache_key, snapshot, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+
+def invalidate_tokens(keys):
+    cache_keys = [token_cache_key(key) for key in keys]
+    for cache_key in cache_keys:
+        local_tokens.delete(cache_key)
+    shared = shared_tokens()
+    if shared is not None and cache_keys:
+        shared.delete_many(cache_keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        if not settings.AUTH_TOKEN_CACHE_ENABLED:
+            return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        snapshot = get_snapshot(cache_key)
+        if snapshot is None:
+            user, token = super().authenticate_credentials(key)
+            set_snapshot(
+                cache_key,
+                tuple(getattr(user, name) for name in SNAPSHOT_FIELDS),
+            )
+            return user, token
+        user = User.from_db(
+            router.db_for_read(User), SNAPSHOT_FIELDS, snapshot
+        )
+        return user, Token(key=key, user=user)
@@ -0,0 +1,60 @@
+import threading
+from bisect import bisect_left
+
+from recipes.models import Ingredient
+
+from .cache import get_version
+
+
+class IngredientLookup:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._table = None
+        self._version = None
+
+    def _load(self, version):
+        rows = sorted(
+            (name.lower(), id, name, measurement_unit)
+            for id, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        self._table = (
+            [key for key, *_ in rows],
+            [
+                {'id': id, 'name': name, 'measurement_unit': measurement_unit}
+                for _, id, name, measurement_unit in rows
+            ],
+        )
+        self._version = version
+
+    def get_table(self):
+        version = get_version('ingredients')
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._load(version)
+        return self._table
+
+    def search(self, name, limit):
+        keys, rows = self.get_table()
+        name = name.lower()
+        result = []
+        position = bisect_left(keys, name)
+        while (
+            position < len(keys)
+            and keys[position].startswith(name)
+            and len(result) < limit
+        ):
+            result.append(rows[position])
+            position += 1
+        if len(result) < limit:
+            for key, row in zip(keys, rows):
+                if name in key and not key.startswith(name):
+                    result.append(row)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+ingredient_lookup = IngredientLookup()
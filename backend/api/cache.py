@@ -0,0 +1,161 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+class LocalLRU:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalLRU(settings.RESPONSE_CACHE_LOCAL_SIZE)
+
+
+def shared_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+# Versions kept in one process are never seen by the other workers.
+def cache_is_shared():
+    return not isinstance(shared_cache(), (LocMemCache, DummyCache))
+
+
+def get_version(namespace):
+    return get_versions([namespace])[namespace]
+
+
+def get_versions(namespaces):
+    keys = {f'version:{namespace}': namespace for namespace in namespaces}
+    found = shared_cache().get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key in keys.keys() - found.keys():
+        # A fresh value keeps entries built before an eviction unreachable.
+        version = time.time_ns()
+        shared_cache().add(key, version, timeout=None)
+        versions[keys[key]] = shared_cache().get(key, version)
+    return versions
+
+
+def bump_version(namespace):
+    key = f'version:{namespace}'
+    try:
+        return shared_cache().incr(key)
+    except ValueError:
+        version = time.time_ns()
+        shared_cache().set(key, version, timeout=None)
+        return version
+
+
+def get_entry(key):
+    entry = local_cache.get(key)
+    if entry is None:
+        entry = shared_cache().get(key)
+        if entry is not None:
+            local_cache.set(key, entry)
+    return entry
+
+
+def get_entries(keys):
+    entries = {}
+    for key in keys:
+        entry = local_cache.get(key)
+        if entry is not None:
+            entries[key] = entry
+    missing = [key for key in keys if key not in entries]
+    if missing:
+        for key, entry in shared_cache().get_many(missing).items():
+            local_cache.set(key, entry)
+            entries[key] = entry
+    return entries
+
+
+def set_entry(key, entry):
+    set_entries({key: entry})
+
+
+def set_entries(entries):
+    for key, entry in entries.items():
+        local_cache.set(key, entry)
+    shared_cache().set_many(entries, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+
+class CachedResponseMixin:
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        shared = cache_is_shared()
+        key = 'response:{}:{}:{}'.format(
+            self.cache_namespace,
+            get_version(self.cache_namespace),
+            request.get_full_path(),
+        )
+        entry = get_entry(key) if shared else shared_cache().get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = request.accepted_renderer.render(
+                response.data,
+                request.accepted_media_type,
+                self.get_renderer_context(),
+            )
+            entry = (quote_etag(hashlib.md5(body).hexdigest()), body)
+            if shared:
+                set_entry(key, entry)
+            else:
+                # Other workers never see the version bumps of this one.
+                shared_cache().set(
+                    key, entry, settings.RESPONSE_CACHE_LOCAL_TIMEOUT
+                )
+        etag, body = entry
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                body, content_type=request.accepted_renderer.media_type
+            )
+        response['ETag'] = etag
+        return response
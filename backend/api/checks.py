@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .cache import cache_is_shared
+
+SHARED_CACHE_SETTINGS = (
+    'RECIPE_CACHE_ENABLED',
+    'INGREDIENT_SEARCH_IN_MEMORY',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [
+        Warning(
+            f'{name} не действует: кеш {settings.RESPONSE_CACHE_ALIAS!r} '
+            'локален для процесса.',
+            hint='Укажите общий кеш в CACHE_BACKEND и CACHE_LOCATION.',
+            id='api.W001',
+        )
+        for name in SHARED_CACHE_SETTINGS
+        if getattr(settings, name)
+    ]
+
+
+@register()
+def check_token_cache(app_configs, **kwargs):
+    if (
+        not settings.AUTH_TOKEN_CACHE_ENABLED
+        or settings.AUTH_TOKEN_CACHE_ALIAS is not None
+    ):
+        return []
+    return [
+        Warning(
+            'AUTH_TOKEN_CACHE_ALIAS не задан: отозванный токен действует в '
+            'других процессах ещё AUTH_TOKEN_LOCAL_TIMEOUT секунд.',
+            hint='Укажите общий кеш в AUTH_TOKEN_CACHE_ALIAS.',
+            id='api.W002',
+        )
+    ]
@@ -0,0 +1,140 @@
+import heapq
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.conf import settings
+
+from recipes.models import RecipeIngredient
+
+from .cache import bump_version, cache_is_shared, get_version, shared_cache
+
+NAMESPACE = 'recipe-ingredients'
+
+
+def change_key(version):
+    return f'{NAMESPACE}:change:{version}'
+
+
+def record_change(recipe_id):
+    version = bump_version(NAMESPACE)
+    shared_cache().set(
+        change_key(version),
+        recipe_id,
+        timeout=settings.RESPONSE_CACHE_TIMEOUT,
+    )
+
+
+def links(queryset):
+    recipes = defaultdict(list)
+    for recipe_id, ingredient_id in queryset.values_list(
+        'recipe_id', 'ingredient_id'
+    ).iterator(chunk_size=10000):
+        recipes[recipe_id].append(ingredient_id)
+    return recipes
+
+
+def build_index(queryset):
+    postings = defaultdict(list)
+    recipes = {}
+    queryset = queryset.order_by('recipe_id')
+    for recipe_id, ingredients in links(queryset).items():
+        recipes[recipe_id] = tuple(ingredients)
+        for ingredient_id in ingredients:
+            postings[ingredient_id].append(recipe_id)
+    return (
+        {key: array('Q', value) for key, value in postings.items()},
+        recipes,
+    )
+
+
+class CookableIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+        self._expires = 0
+
+    def _load(self, version):
+        self._index = build_index(RecipeIngredient.objects.all())
+        self._version = version
+        self._expires = time.monotonic() + settings.COOKABLE_LOCAL_TIMEOUT
+
+    # Versions in a local cache miss the other workers' changes, so the
+    # index is rebuilt from time to time instead.
+    def _expired(self):
+        return not cache_is_shared() and time.monotonic() >= self._expires
+
+    def _replay(self, version):
+        if not 0 < version - self._version <= settings.COOKABLE_REPLAY_LIMIT:
+            return False
+        keys = [change_key(v) for v in range(self._version + 1, version + 1)]
+        changes = shared_cache().get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        changed = set(changes.values())
+        current = links(RecipeIngredient.objects.filter(recipe__in=changed))
+        postings, recipes = dict(self._index[0]), dict(self._index[1])
+        touched = set()
+        for recipe_id in changed:
+            touched.update(recipes.pop(recipe_id, ()))
+            if recipe_id in current:
+                recipes[recipe_id] = tuple(current[recipe_id])
+                touched.update(current[recipe_id])
+        for ingredient_id in touched:
+            kept = [
+                recipe_id
+                for recipe_id in postings.get(ingredient_id, ())
+                if recipe_id not in changed
+            ]
+            kept.extend(
+                recipe_id
+                for recipe_id in changed
+                if ingredient_id in current.get(recipe_id, ())
+            )
+            if kept:
+                postings[ingredient_id] = array('Q', sorted(kept))
+            else:
+                postings.pop(ingredient_id, None)
+        self._index = (postings, recipes)
+        self._version = version
+        return True
+
+    def get_index(self):
+        version = get_version(NAMESPACE)
+        if self._version != version or self._expired():
+            with self._lock:
+                if self._expired() or (
+                    self._version != version
+                    and not (
+                        self._version is not None and self._replay(version)
+                    )
+                ):
+                    self._load(version)
+        return self._index
+
+    def search(self, ingredient_ids, limit):
+        postings, recipes = self.get_index()
+        matches = Counter(
+            chain.from_iterable(
+                postings.get(ingredient_id, ())
+                for ingredient_id in set(ingredient_ids)
+            )
+        )
+        return [
+            (recipe_id, matched, len(recipes[recipe_id]))
+            for recipe_id, matched in heapq.nlargest(
+                limit,
+                matches.items(),
+                key=lambda item: (
+                    item[1] / len(recipes[item[0]]),
+                    item[1],
+                    item[0],
+                ),
+            )
+        ]
+
+
+cookable_index = CookableIndex()
@@ -0,0 +1,81 @@
+from .serializers import image_variant_urls
+
+
+def image_url(image, request):
+    if not image:
+        return None
+    if request is not None:
+        return request.build_absolute_uri(image.url)
+    return image.url
+
+
+def tag_dict(tag):
+    return {
+        'id': tag.id,
+        'name': tag.name,
+        'color': tag.color,
+        'slug': tag.slug,
+    }
+
+
+def user_dict(user, is_subscribed):
+    return {
+        'id': user.id,
+        'email': user.email,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_subscribed': is_subscribed,
+    }
+
+
+def recipe_minified_dict(recipe, request=None):
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'image': image_url(recipe.image, request),
+        'image_variants': image_variant_urls(recipe.image, request),
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def recipe_payload(recipe):
+    return {
+        'tags': [tag_dict(tag) for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'id': row.ingredient.id,
+                'name': row.ingredient.name,
+                'measurement_unit': row.ingredient.measurement_unit,
+                'amount': row.amount,
+            }
+            for row in recipe.recipeingredients.all()
+        ],
+    }
+
+
+def recipe_dict(recipe, request, payload=None):
+    if payload is None:
+        payload = recipe_payload(recipe)
+    return {
+        'id': recipe.id,
+        'tags': payload['tags'],
+        'author': user_dict(recipe.author, recipe.is_author_subscribed),
+        'ingredients': payload['ingredients'],
+        'is_favorited': recipe.is_favorited,
+        'is_in_shopping_cart': recipe.is_in_shopping_cart,
+        'name': recipe.name,
+        'image': image_url(recipe.image, request),
+        'image_variants': image_variant_urls(recipe.image, request),
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def follower_dict(user):
+    data = user_dict(user, user.is_subscribed)
+    data['recipes'] = [
+        recipe_minified_dict(recipe) for recipe in user.recipe_previews
+    ]
+    data['recipes_count'] = user.recipes_count
+    return data
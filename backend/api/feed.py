@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+
+from recipes.models import Recipe
+
+from .cache import get_entries, get_versions, set_entries
+from .fast import recipe_dict
+from .metrics import registry
+
+cache_requests = registry.counter(
+    'recipe_cache_requests_total', 'Recipe body cache lookups by result'
+)
+cache_latency = registry.histogram(
+    'recipe_cache_render_seconds',
+    'Time to render a page of recipes, by whether every body was cached',
+)
+
+
+def recipe_body_keys(request, recipes):
+    versions = get_versions(
+        {'tags', 'ingredients'}
+        | {f'recipe:{recipe.pk}' for recipe in recipes}
+        | {f'user:{recipe.author_id}' for recipe in recipes}
+    )
+    prefix = 'recipe-body:{}:{}:{}'.format(
+        request.build_absolute_uri('/'),
+        versions['tags'],
+        versions['ingredients'],
+    )
+    return {
+        recipe.pk: '{}:{}:{}:{}'.format(
+            prefix,
+            recipe.pk,
+            versions[f'recipe:{recipe.pk}'],
+            versions[f'user:{recipe.author_id}'],
+        )
+        for recipe in recipes
+    }
+
+
+def build_bodies(request, recipe_ids):
+    from .serializers import RecipeSerializerRead
+
+    recipes = (
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .with_related()
+        .with_user_flags(AnonymousUser())
+    )
+    if settings.FAST_SERIALIZERS:
+        bodies = [recipe_dict(recipe, request) for recipe in recipes]
+    else:
+        bodies = RecipeSerializerRead(
+            recipes, many=True, context={'request': request}
+        ).data
+    return {body['id']: body for body in bodies}
+
+
+def render_recipes(request, recipes):
+    start = time.perf_counter()
+    keys = recipe_body_keys(request, recipes)
+    bodies = get_entries(list(keys.values()))
+    missing = [pk for pk, key in keys.items() if key not in bodies]
+    if missing:
+        built = build_bodies(request, missing)
+        set_entries({keys[pk]: body for pk, body in built.items()})
+        bodies.update((keys[pk], body) for pk, body in built.items())
+    cache_requests.inc(len(keys) - len(missing), result='hit')
+    cache_requests.inc(len(missing), result='miss')
+    data = []
+    for recipe in recipes:
+        body = dict(bodies[keys[recipe.pk]])
+        body['author'] = dict(
+            body['author'], is_subscribed=recipe.is_author_subscribed
+        )
+        body['is_favorited'] = recipe.is_favorited
+        body['is_in_shopping_cart'] = recipe.is_in_shopping_cart
+        data.append(body)
+    cache_latency.observe(
+        time.perf_counter() - start, result='miss' if missing else 'hit'
+    )
+    return data
@@ -1,17 +1,31 @@
 from enum import IntEnum
 
 import django_filters
+from django.db.models import Case, Exists, IntegerField, OuterRef, Value, When
 
 from recipes.models import Ingredient, Recipe, Tag
 
 
 class IngredientFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(lookup_expr='icontains')
+    name = django_filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
 
+    def filter_name(self, queryset, name, value):
+        return (
+            queryset.filter(name__icontains=value)
+            .annotate(
+                is_substring=Case(
+                    When(name__istartswith=value, then=Value(0)),
+                    default=Value(1),
+                    output_field=IntegerField(),
+                )
+            )
+            .order_by('is_substring', 'name')
+        )
+
 
 class FilterFlag(IntEnum):
     TRUE = 1
@@ -27,11 +41,41 @@ class RecipeFilter(django_filters.FilterSet):
         field_name='tags__slug',
         to_field_name='slug',
         queryset=Tag.objects.all(),
+        method='filter_tags',
+    )
+    tags_match = django_filters.ChoiceFilter(
+        choices=(('any', 'any'), ('all', 'all')), method='skip'
     )
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
+        fields = (
+            'is_favorited',
+            'is_in_shopping_cart',
+            'author',
+            'tags',
+            'tags_match',
+            'search',
+        )
+
+    def skip(self, queryset, name, value):
+        return queryset
+
+    def filter_tags(self, queryset, name, tags):
+        if not tags:
+            return queryset
+        recipe_tags = Recipe.tags.through.objects.filter(recipe=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_match') == 'all':
+            for tag in tags:
+                queryset = queryset.filter(Exists(recipe_tags.filter(tag=tag)))
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(tag__in=tags)))
+
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return queryset.search(value)
 
     def filter_is_favorited(self, queryset, name, value):
         cur_user = self.request.user
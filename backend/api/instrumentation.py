@@ -0,0 +1,175 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+current_stats = ContextVar('current_stats', default=None)
+
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+SIZE_BUCKETS = tuple(2**power for power in range(8, 25, 2))
+
+requests_total = registry.counter(
+    'api_requests_total', 'Requests by view and status'
+)
+request_seconds = registry.histogram(
+    'api_request_seconds', 'Request latency by view'
+)
+request_queries = registry.histogram(
+    'api_request_queries', 'Database queries per request', QUERY_BUCKETS
+)
+request_duplicate_queries = registry.histogram(
+    'api_request_duplicate_queries',
+    'Queries per request repeating an earlier statement',
+    QUERY_BUCKETS,
+)
+request_db_seconds = registry.histogram(
+    'api_request_db_seconds', 'Time spent in the database per request'
+)
+request_serializer_seconds = registry.histogram(
+    'api_request_serializer_seconds', 'Time spent serializing per request'
+)
+response_bytes = registry.histogram(
+    'api_response_bytes', 'Response body size', SIZE_BUCKETS
+)
+budget_exceeded = registry.counter(
+    'api_budget_exceeded_total', 'Requests over their budget by metric'
+)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    return IN_LIST.sub('IN (...)', sql)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = Counter()
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        return self.query_count - len(self.queries)
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries[fingerprint(sql)] += 1
+
+    def values(self):
+        return {
+            'queries': self.query_count,
+            'duplicates': self.duplicate_count,
+            'db_ms': self.db_seconds * 1000,
+            'serializer_ms': self.serializer_seconds * 1000,
+        }
+
+
+@contextmanager
+def collect_stats():
+    stats = RequestStats()
+    token = current_stats.set(stats)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(stats.record_query)
+                )
+            yield stats
+    finally:
+        current_stats.reset(token)
+
+
+class BudgetExceeded(AssertionError):
+    pass
+
+
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        stats = current_stats.get()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+        stats.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_seconds += time.perf_counter() - start
+            stats.serializing = False
+
+
+def over_budget(view, values):
+    budget = settings.REQUEST_BUDGETS.get(view, {})
+    return {
+        metric: (values[metric], limit)
+        for metric, limit in budget.items()
+        if values.get(metric, 0) > limit
+    }
+
+
+@contextmanager
+def assert_budget(view):
+    with collect_stats() as stats:
+        yield stats
+    exceeded = over_budget(view, stats.values())
+    if exceeded:
+        raise BudgetExceeded(f'{view} превысил бюджет: {exceeded}')
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with collect_stats() as stats:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unresolved'
+        requests_total.inc(view=view, status=response.status_code)
+        request_seconds.observe(elapsed, view=view)
+        request_queries.observe(stats.query_count, view=view)
+        request_duplicate_queries.observe(stats.duplicate_count, view=view)
+        request_db_seconds.observe(stats.db_seconds, view=view)
+        request_serializer_seconds.observe(
+            stats.serializer_seconds, view=view
+        )
+        values = stats.values()
+        if not response.streaming:
+            response_bytes.observe(len(response.content), view=view)
+            values['bytes'] = len(response.content)
+        for metric, (value, limit) in over_budget(view, values).items():
+            budget_exceeded.inc(view=view, metric=metric)
+            logger.warning(
+                '%s: %s = %s, бюджет %s', view, metric, round(value, 1), limit
+            )
+        repeated = [
+            (sql, count)
+            for sql, count in stats.queries.items()
+            if count >= settings.N_PLUS_ONE_THRESHOLD
+        ]
+        for sql, count in repeated:
+            logger.warning('%s: запрос выполнен %s раз: %s', view, count, sql)
+        return response
@@ -0,0 +1,126 @@
+import bisect
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5,
+)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('"', '\\"'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] += amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, labels, value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0)
+            )
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = {
+                key: (list(counts), total)
+                for key, (counts, total) in self._values.items()
+            }
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                bucket = labels + (('le', bound),)
+                yield f'{self.name}_bucket', bucket, cumulative
+            yield f'{self.name}_count', labels, cumulative
+            yield f'{self.name}_sum', labels, total
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help):
+        return self.register(Counter(name, help))
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, buckets))
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Values live in the memory of one process: with several gunicorn
+# workers each scrape sees only the worker that served it.
+registry = Registry()
+
+
+def can_scrape(request):
+    if request.user.is_staff:
+        return True
+    return bool(settings.METRICS_TOKEN) and constant_time_compare(
+        request.headers.get('Authorization', ''),
+        f'Bearer {settings.METRICS_TOKEN}',
+    )
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not can_scrape(request):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
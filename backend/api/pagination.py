@@ -1,7 +1,167 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+# Rows of these tables change with the user's own writes, so a cached
+# count would hide or invent pages right after them.
+USER_TABLES = {
+    model._meta.db_table for model in (Favorite, ShoppingCart, Follow)
+}
+
+
+def depends_on_user(queryset):
+    query = queryset.query
+    if any(
+        join.table_name in USER_TABLES for join in query.alias_map.values()
+    ):
+        return True
+    try:
+        sql, _ = query.get_compiler(queryset.db).compile(query.where)
+    except EmptyResultSet:
+        return True
+    return any(
+        connections[queryset.db].ops.quote_name(table) in sql
+        for table in USER_TABLES
+    )
+
+
+class CachedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or depends_on_user(self.object_list):
+            return super().count
+        key = 'count:' + hashlib.md5(str(query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.PAGINATION_COUNT_TIMEOUT)
+        return count
+
+
+class KeysetPagination(pagination.BasePagination):
+    cursor_query_param = 'cursor'
+
+    def __init__(self, ordering, page_size):
+        self.ordering = ordering
+        self.page_size = page_size
+
+    def decode_cursor(self, cursor, model):
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list):
+                raise ValueError
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.clean_value(model, field, value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound('Неверный курсор')
+
+    @staticmethod
+    def clean_value(model, field, value):
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError
+        value = model._meta.get_field(field.lstrip('-')).clean(value, None)
+        if isinstance(value, datetime) and timezone.is_naive(value):
+            raise ValueError
+        return value
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def after(self, values):
+        condition = None
+        for field, value in reversed(list(zip(self.ordering, values))):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            beyond = Q(**{f'{name}__{lookup}': value})
+            if condition is not None:
+                beyond |= Q(**{name: value}) & condition
+            condition = beyond
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        values = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param), queryset.model
+        )
+        queryset = queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self.after(values))
+        page = list(queryset[: self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[: self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
 
 
 class CustomPagination(pagination.PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
     page_size_query_param = 'limit'
     page_size = 6
     max_page_size = 50
+    cursor_ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (
+            self.cursor_ordering
+            and KeysetPagination.cursor_query_param in request.query_params
+        ):
+            self.keyset = KeysetPagination(
+                self.cursor_ordering, self.get_page_size(request)
+            )
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(CustomPagination):
+    cursor_ordering = ('-pub_date', '-id')
+
+
+class UserPagination(CustomPagination):
+    cursor_ordering = ('username', 'id')
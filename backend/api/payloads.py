@@ -0,0 +1,36 @@
+import hashlib
+
+from django.utils.http import quote_etag
+
+from recipes.models import Recipe
+
+from .fast import recipe_payload
+
+
+def ensure_payload(recipe):
+    if recipe.payload is None:
+        recipe.payload = recipe_payload(
+            Recipe.objects.with_related().get(pk=recipe.pk)
+        )
+        # An edit made meanwhile bumped the version; its payload stays empty.
+        Recipe.objects.filter(pk=recipe.pk, version=recipe.version).update(
+            payload=recipe.payload
+        )
+    return recipe.payload
+
+
+def recipe_etag(recipe):
+    author = recipe.author
+    state = (
+        recipe.pk,
+        recipe.version,
+        author.pk,
+        author.email,
+        author.username,
+        author.first_name,
+        author.last_name,
+        recipe.is_author_subscribed,
+        recipe.is_favorited,
+        recipe.is_in_shopping_cart,
+    )
+    return quote_etag(hashlib.md5(repr(state).encode()).hexdigest())
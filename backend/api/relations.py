@@ -0,0 +1,121 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+CREATED = 'created'
+EXISTS = 'exists'
+DELETED = 'deleted'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+
+
+# Counters that drifted to zero must not trip the CHECK constraint.
+def shifted(counter, delta):
+    return Greatest(F(counter) + delta, 0)
+
+
+class Relation:
+    def __init__(self, model, target_field, counter_field):
+        self.model = model
+        self.target_field = target_field
+        self.target = model._meta.get_field(target_field)
+        self.target_model = self.target.related_model
+        self.counter_field = counter_field
+
+    def _count(self, target_ids, delta):
+        if target_ids:
+            self.target_model.objects.filter(pk__in=target_ids).update(
+                **{self.counter_field: shifted(self.counter_field, delta)}
+            )
+
+    def _execute(self, sql, params):
+        returning = connection.ops.quote_name(self.target.column)
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} RETURNING {returning}', params)
+            return {target_id for target_id, in cursor.fetchall()}
+
+    # Both statements report the rows they really changed, so concurrent
+    # requests never count a row twice. They bypass the model signals.
+    def _insert(self, user, target_ids):
+        if not target_ids:
+            return set()
+        fields = [
+            field
+            for field in self.model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        rows = [
+            [
+                field.get_db_prep_save(field.pre_save(row, True), connection)
+                for field in fields
+            ]
+            for row in (
+                self.model(user=user, **{f'{self.target_field}_id': target_id})
+                for target_id in target_ids
+            )
+        ]
+        quote_name = connection.ops.quote_name
+        placeholders = '({})'.format(', '.join(['%s'] * len(fields)))
+        return self._execute(
+            'INSERT INTO {} ({}) VALUES {} ON CONFLICT DO NOTHING'.format(
+                quote_name(self.model._meta.db_table),
+                ', '.join(quote_name(field.column) for field in fields),
+                ', '.join([placeholders] * len(rows)),
+            ),
+            [value for row in rows for value in row],
+        )
+
+    def _delete(self, user, target_ids):
+        if not target_ids:
+            return set()
+        quote_name = connection.ops.quote_name
+        return self._execute(
+            'DELETE FROM {} WHERE {} = %s AND {} IN ({})'.format(
+                quote_name(self.model._meta.db_table),
+                quote_name(self.model._meta.get_field('user').column),
+                quote_name(self.target.column),
+                ', '.join(['%s'] * len(target_ids)),
+            ),
+            [user.pk, *map(self.target.get_prep_value, target_ids)],
+        )
+
+    def add(self, user, target_id):
+        try:
+            with transaction.atomic():
+                created = self._insert(user, [target_id])
+                self._count(created, 1)
+        except IntegrityError:
+            return False
+        return bool(created)
+
+    def remove(self, user, target_id):
+        with transaction.atomic():
+            deleted = self._delete(user, [target_id])
+            self._count(deleted, -1)
+        return bool(deleted)
+
+    def add_many(self, user, target_ids):
+        results = dict.fromkeys(target_ids, NOT_FOUND)
+        found = set(
+            self.target_model.objects.filter(pk__in=target_ids).values_list(
+                'pk', flat=True
+            )
+        )
+        if self.target_model is type(user):
+            found.discard(user.pk)
+            if user.pk in results:
+                results[user.pk] = INVALID
+        with transaction.atomic():
+            created = self._insert(user, sorted(found))
+            self._count(created, 1)
+        results.update(dict.fromkeys(found - created, EXISTS))
+        results.update(dict.fromkeys(created, CREATED))
+        return results
+
+    def remove_many(self, user, target_ids):
+        results = dict.fromkeys(target_ids, NOT_FOUND)
+        with transaction.atomic():
+            deleted = self._delete(user, sorted(set(target_ids)))
+            self._count(deleted, -1)
+        results.update(dict.fromkeys(deleted, DELETED))
+        return results
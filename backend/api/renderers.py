@@ -0,0 +1,45 @@
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PlainTextRenderer(renderers.BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # Same output as JSONRenderer, which escapes these for JavaScript.
+        return (
+            orjson.dumps(
+                data,
+                default=JSONEncoder().default,
+                option=orjson.OPT_NON_STR_KEYS,
+            )
+            .replace(b'\xe2\x80\xa8', b'\\u2028')
+            .replace(b'\xe2\x80\xa9', b'\\u2029')
+        )
@@ -1,25 +1,113 @@
 import base64
+import binascii
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
 from djoser import serializers as djoser_serializers
+from PIL import Image
 from rest_framework import serializers
 
+from recipes.images import schedule_variants, variant_urls
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
 from users.models import User
 
+from .instrumentation import TimedSerializerMixin
+from .viewer import get_viewer
+
+BASE64_CHUNK_SIZE = 64 * 1024
+
 
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
+            format, _, imgstr = data.partition(';base64,')
             ext = format.split('/')[-1]
+            data = self.decode(imgstr, 'temp.' + ext, format[len('data:'):])
+        return super().to_internal_value(data)
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    def decode(self, imgstr, name, content_type):
+        if len(imgstr) // 4 * 3 > settings.RECIPE_IMAGE_MAX_BYTES:
+            raise serializers.ValidationError('Изображение слишком большое')
+        file = TemporaryUploadedFile(name, content_type, 0, None)
+        try:
+            for start in range(0, len(imgstr), BASE64_CHUNK_SIZE):
+                file.write(
+                    base64.b64decode(imgstr[start:start + BASE64_CHUNK_SIZE])
+                )
+        except binascii.Error:
+            file.close()
+            raise serializers.ValidationError('Некорректное изображение')
+        file.size = file.tell()
+        file.seek(0)
+        try:
+            with Image.open(file.temporary_file_path()) as image:
+                width, height = image.size
+        except (OSError, SyntaxError, ValueError):
+            file.close()
+            raise serializers.ValidationError('Некорректное изображение')
+        except Image.DecompressionBombError:
+            width = height = None
+        if width is None or width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            file.close()
+            raise serializers.ValidationError(
+                'Слишком большое разрешение изображения'
+            )
+        return file
+
+
+def image_variant_urls(image, request):
+    if not image:
+        return {}
+    urls = variant_urls(image.name)
+    if request is not None:
+        urls = {
+            width: request.build_absolute_uri(url)
+            for width, url in urls.items()
+        }
+    return urls
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    def to_representation(self, image):
+        return image_variant_urls(image, self.context.get('request'))
+
+
+def get_recipes_limit(request):
+    value = request.query_params.get('recipes_limit')
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise serializers.ValidationError(
+            {'recipes_limit': ['Введите целое число.']}
+        )
+    return limit if limit > 0 else None
 
-        return super().to_internal_value(data)
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RELATION_MAX_IDS,
+    )
 
 
-class UserSerializer(djoser_serializers.UserSerializer):
+class CookableQuerySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RELATION_MAX_IDS,
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.COOKABLE_LIMIT,
+        default=settings.COOKABLE_LIMIT,
+    )
+
+
+class UserSerializer(TimedSerializerMixin, djoser_serializers.UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -34,16 +122,14 @@ class UserSerializer(djoser_serializers.UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        cur_user = self.context['request'].user
-        return (
-            cur_user.is_authenticated
-            and obj.following.filter(user=cur_user).exists()
-        )
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.pk in get_viewer(self.context['request']).following
 
 
 class FollowerSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -59,36 +145,46 @@ class FollowerSerializer(UserSerializer):
         )
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'recipe_previews'):
+            return RecipeMinified(obj.recipe_previews, many=True).data
         queryset = obj.recipes.all()
-        request = self.context['request']
-        recipes_limit = int(request.query_params.get('recipes_limit', 0))
-        if recipes_limit > 0:
+        recipes_limit = get_recipes_limit(self.context['request'])
+        if recipes_limit:
             queryset = queryset[:recipes_limit]
         return RecipeMinified(queryset, many=True).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
 
+class RecipeMinified(TimedSerializerMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField(source='image')
 
-class RecipeMinified(serializers.ModelSerializer):
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
-class TagSerializer(serializers.ModelSerializer):
+class CookableRecipeSerializer(RecipeMinified):
+    coverage = serializers.FloatField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeMinified.Meta):
+        fields = RecipeMinified.Meta.fields + ('coverage', 'missing')
+
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit')
 
 
-class RecipeIngredientSerializerRead(serializers.ModelSerializer):
+class RecipeIngredientSerializerRead(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     id = serializers.IntegerField(source='ingredient.id')
     name = serializers.CharField(source='ingredient.name')
     measurement_unit = serializers.CharField(
@@ -105,7 +201,7 @@ class RecipeIngredientSerializerRead(serializers.ModelSerializer):
         )
 
 
-class RecipeSerializerRead(serializers.ModelSerializer):
+class RecipeSerializerRead(TimedSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(read_only=True, many=True)
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientSerializerRead(
@@ -113,6 +209,7 @@ class RecipeSerializerRead(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source='image')
 
     class Meta:
         model = Recipe
@@ -125,36 +222,47 @@ class RecipeSerializerRead(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
 
+    def to_representation(self, recipe):
+        if hasattr(recipe, 'is_author_subscribed'):
+            recipe.author.is_subscribed = recipe.is_author_subscribed
+        return super().to_representation(recipe)
+
     def get_is_favorited(self, recipe):
-        cur_user = self.context['request'].user
-        return (
-            cur_user.is_authenticated
-            and recipe.favorited.filter(id=cur_user.id).exists()
-        )
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
+        return recipe.pk in get_viewer(self.context['request']).favorited
 
     def get_is_in_shopping_cart(self, recipe):
-        cur_user = self.context['request'].user
-        return (
-            cur_user.is_authenticated
-            and recipe.shopping_cart.filter(id=cur_user.id).exists()
-        )
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
+        return recipe.pk in get_viewer(self.context['request']).in_cart
 
 
 class RecipeIngredientSerializerWrite(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField(min_value=1)
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
 
 
+def does_not_exist(pk):
+    return serializers.PrimaryKeyRelatedField.default_error_messages[
+        'does_not_exist'
+    ].format(pk_value=pk)
+
+
 class RecipeSerializerWrite(serializers.ModelSerializer):
     image = Base64ImageField()
     ingredients = RecipeIngredientSerializerWrite(many=True)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
 
     class Meta:
         model = Recipe
@@ -167,6 +275,13 @@ class RecipeSerializerWrite(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def validate_tags(self, tags):
+        found = Tag.objects.in_bulk(set(tags))
+        missing = [pk for pk in tags if pk not in found]
+        if missing:
+            raise serializers.ValidationError(does_not_exist(missing[0]))
+        return list(dict.fromkeys(tags))
+
     def validate_ingredients(self, ingredients):
         if not ingredients:
             raise serializers.ValidationError(
@@ -177,36 +292,81 @@ class RecipeSerializerWrite(serializers.ModelSerializer):
             ingredients
         ):
             raise serializers.ValidationError('Нельзя дублировать ингредиенты')
+        found = Ingredient.objects.in_bulk(
+            [ingredient['id'] for ingredient in ingredients]
+        )
+        if len(found) != len(ingredients):
+            raise serializers.ValidationError(
+                [
+                    {}
+                    if ingredient['id'] in found
+                    else {'id': [does_not_exist(ingredient['id'])]}
+                    for ingredient in ingredients
+                ]
+            )
         return ingredients
 
     def make_ingredients(self, recipe, ingredients):
         RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
                 recipe=recipe,
-                ingredient=ingredient['id'],
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount'],
             )
             for ingredient in ingredients
         )
 
+    def update_ingredients(self, recipe, ingredients):
+        current = {
+            row.ingredient_id: row for row in recipe.recipeingredients.all()
+        }
+        created, changed = [], []
+        for ingredient in ingredients:
+            row = current.pop(ingredient['id'], None)
+            if row is None:
+                created.append(ingredient)
+            elif row.amount != ingredient['amount']:
+                row.amount = ingredient['amount']
+                changed.append(row)
+        if current:
+            RecipeIngredient.objects.filter(
+                pk__in=[row.pk for row in current.values()]
+            ).delete()
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self.make_ingredients(recipe, created)
+
+    def process_image(self, recipe, upload):
+        upload.close()
+        name = recipe.image.name
+        transaction.on_commit(lambda: schedule_variants(name))
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
+        recipe.tags.add(*tags)
         self.make_ingredients(recipe, ingredients)
+        self.process_image(recipe, validated_data['image'])
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         ingredients = validated_data.pop('ingredients', None)
         tags = validated_data.pop('tags', None)
         super().update(recipe, validated_data)
-        if tags:
+        if 'image' in validated_data:
+            self.process_image(recipe, validated_data['image'])
+        if tags is not None:
             recipe.tags.set(tags)
-        if ingredients:
-            recipe.ingredients.clear()
-            self.make_ingredients(recipe, ingredients)
+        if ingredients is not None:
+            self.update_ingredients(recipe, ingredients)
         return recipe
 
     def to_representation(self, instance):
+        instance = (
+            Recipe.objects.with_related()
+            .with_user_flags(self.context['request'].user)
+            .get(pk=instance.pk)
+        )
         return RecipeSerializerRead(instance, context=self.context).data
@@ -0,0 +1,85 @@
+import csv
+import hashlib
+import json
+
+from django.db.models import F, Sum
+from django.utils.http import quote_etag
+
+from recipes.models import RecipeIngredient, ShoppingCart
+
+CHUNK_SIZE = 500
+
+
+def cart_ingredients(user):
+    return RecipeIngredient.objects.filter(recipe__shopping_cart=user)
+
+
+def cart_etag(user, format):
+    # Ingredient edits and renames bump the version of every recipe using it.
+    digest = hashlib.md5(format.encode())
+    rows = (
+        ShoppingCart.objects.filter(user=user)
+        .order_by('recipe_id')
+        .values_list('recipe_id', 'recipe__version')
+    )
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        digest.update(repr(row).encode())
+    return quote_etag(digest.hexdigest())
+
+
+def cart_summary(user):
+    return (
+        cart_ingredients(user)
+        .values(
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+        )
+        .annotate(total=Sum('amount'))
+        .order_by('name', 'measurement_unit')
+    )
+
+
+def cart_totals(user):
+    return cart_summary(user).iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def render_txt(rows):
+    for row in rows:
+        yield f'{row["name"]}: {row["total"]} {row["measurement_unit"]}\n'
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in rows:
+        yield writer.writerow(
+            (row['name'], row['measurement_unit'], row['total'])
+        )
+
+
+def render_json(rows):
+    separator = '['
+    for row in rows:
+        yield separator + json.dumps(
+            {
+                'name': row['name'],
+                'measurement_unit': row['measurement_unit'],
+                'amount': row['total'],
+            },
+            ensure_ascii=False,
+            separators=(',', ':'),
+        )
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+WRITERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+    'json': render_json,
+}
@@ -0,0 +1,215 @@
+import weakref
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Follow, User
+
+from .authentication import invalidate_tokens
+from .cache import bump_version
+from .cookable import record_change
+from .relations import shifted
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tags(**kwargs):
+    bump_version('tags')
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredients(**kwargs):
+    bump_version('ingredients')
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=shifted('recipes_count', 1)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(instance, **kwargs):
+    User.objects.filter(pk=instance.author_id).update(
+        recipes_count=shifted('recipes_count', -1)
+    )
+
+
+# Relation writes through raw SQL and counts its own rows; these cover
+# admin edits and cascades.
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Follow: (User, 'following_id', 'followers_count'),
+}
+
+
+def count_relation(sender, instance, delta):
+    model, target, counter = COUNTERS[sender]
+    model.objects.filter(pk=getattr(instance, target)).update(
+        **{counter: shifted(counter, delta)}
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+def count_created_relation(sender, instance, created, **kwargs):
+    if created:
+        count_relation(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+def count_deleted_relation(sender, instance, **kwargs):
+    count_relation(sender, instance, -1)
+
+
+def bump_on_commit(namespace):
+    transaction.on_commit(partial(bump_version, namespace))
+
+
+def update_search_vectors(**lookup):
+    transaction.on_commit(
+        lambda: Recipe.objects.filter(**lookup).update_search_vectors()
+    )
+
+
+class RecipeChanges:
+    def __init__(self):
+        self.changed = set()
+        self.indexed = set()
+        self.touched = {}
+
+    def touch(self, recipe_id):
+        savepoints = tuple(transaction.get_connection().savepoint_ids)
+        scope = self.touched.get(recipe_id)
+        # A touch made in a savepoint that has ended may have been undone.
+        if scope is None or savepoints[:len(scope)] != scope:
+            Recipe.objects.filter(pk=recipe_id).touch()
+            self.touched[recipe_id] = savepoints
+
+    def __call__(self):
+        connection = transaction.get_connection()
+        if pending_changes(connection) is self:
+            connection.recipe_changes = None
+        if self.indexed:
+            Recipe.objects.filter(pk__in=self.indexed).update_search_vectors()
+        for recipe_id in sorted(self.indexed):
+            record_change(recipe_id)
+        for recipe_id in sorted(self.changed):
+            bump_version(f'recipe:{recipe_id}')
+
+
+# Only the commit hooks hold the batch: a rollback that discards the hook
+# also ends the weak reference, and the next change starts a new batch.
+def pending_changes(connection):
+    ref = getattr(connection, 'recipe_changes', None)
+    return ref() if ref is not None else None
+
+
+# A recipe edit fires receivers for the recipe, its tags and every
+# ingredient row; one commit hook per transaction collects them all.
+def recipe_changed(recipe_id, touch=False, index=False):
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        changes = pending_changes(connection)
+        if changes is None:
+            changes = RecipeChanges()
+            connection.recipe_changes = weakref.ref(changes)
+            transaction.on_commit(changes)
+    else:
+        changes = RecipeChanges()
+    changes.changed.add(recipe_id)
+    if index:
+        changes.indexed.add(recipe_id)
+    if touch:
+        changes.touch(recipe_id)
+    if not connection.in_atomic_block:
+        changes()
+
+
+@receiver(post_save, sender=Recipe)
+def change_recipe(instance, created, **kwargs):
+    recipe_changed(instance.pk, touch=not created, index=True)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe(instance, **kwargs):
+    recipe_changed(instance.pk, index=True)
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def change_recipe_ingredients(instance, **kwargs):
+    recipe_changed(instance.recipe_id, touch=True, index=True)
+
+
+@receiver(post_save, sender=Ingredient)
+def index_ingredient_recipes(instance, created, **kwargs):
+    if not created:
+        update_search_vectors(recipeingredients__ingredient=instance)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def change_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            recipe_changed(instance.pk, touch=True)
+    elif action == 'pre_clear':
+        Recipe.objects.filter(tags=instance).touch()
+    elif action == 'post_clear':
+        bump_on_commit('tags')
+    elif action.startswith('post_') and pk_set:
+        Recipe.objects.filter(pk__in=pk_set).touch()
+        for pk in pk_set:
+            bump_on_commit(f'recipe:{pk}')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(instance, **kwargs):
+    Recipe.objects.filter(tags=instance).touch()
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(recipeingredients__ingredient=instance).touch()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(instance, **kwargs):
+    bump_on_commit(f'user:{instance.pk}')
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    transaction.on_commit(partial(invalidate_tokens, [instance.key]))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, **kwargs):
+    if settings.AUTH_TOKEN_CACHE_ENABLED:
+        keys = list(
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        )
+        transaction.on_commit(partial(invalidate_tokens, keys))
@@ -1,6 +1,17 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import (
+    async_read,
+    has_query,
+    offloaded,
+    recipe_detail,
+    recipe_list,
+    subscriptions,
+    uses_cursor,
+)
+from .metrics import metrics_view
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 router = DefaultRouter()
@@ -9,7 +20,40 @@ router.register('tags', TagViewSet, basename='tag')
 router.register('ingredients', IngredientViewSet, basename='ingredient')
 router.register('recipes', RecipeViewSet, basename='recipe')
 
-urlpatterns = [
+sync_views = {url.name: url.callback for url in router.urls}
+
+async_urlpatterns = [
+    path(
+        'recipes/',
+        async_read(recipe_list, sync_views['recipe-list'], uses_cursor),
+        name='recipe-list',
+    ),
+    path(
+        'recipes/<int:pk>/',
+        async_read(recipe_detail, sync_views['recipe-detail'], has_query),
+        name='recipe-detail',
+    ),
+    path(
+        'users/subscriptions/',
+        async_read(
+            subscriptions, sync_views['user-subscriptions'], uses_cursor
+        ),
+        name='user-subscriptions',
+    ),
+    path('tags/', offloaded(sync_views['tag-list']), name='tag-list'),
+    path(
+        'ingredients/',
+        offloaded(sync_views['ingredient-list']),
+        name='ingredient-list',
+    ),
+]
+
+sync_urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
+
+urlpatterns = sync_urlpatterns
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = async_urlpatterns + sync_urlpatterns
@@ -0,0 +1,38 @@
+from functools import cached_property
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+
+class ViewerContext:
+    def __init__(self, user):
+        self.user = user
+
+    def load(self, model, field):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(
+            model.objects.filter(user=self.user)
+            .order_by()
+            .values_list(field, flat=True)
+        )
+
+    @cached_property
+    def favorited(self):
+        return self.load(Favorite, 'recipe_id')
+
+    @cached_property
+    def in_cart(self):
+        return self.load(ShoppingCart, 'recipe_id')
+
+    @cached_property
+    def following(self):
+        return self.load(Follow, 'following_id')
+
+
+def get_viewer(request):
+    http_request = getattr(request, '_request', request)
+    viewer = getattr(http_request, 'viewer_context', None)
+    if viewer is None or viewer.user != request.user:
+        viewer = http_request.viewer_context = ViewerContext(request.user)
+    return viewer
@@ -1,79 +1,233 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
 from djoser import views
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
 from recipes.models import Ingredient, Recipe, Tag
 from users.models import Follow, User
 
+from .autocomplete import ingredient_lookup
+from .cache import CachedResponseMixin, cache_is_shared
+from .cookable import cookable_index
+from .fast import follower_dict, recipe_dict
+from .feed import render_recipes
 from .filters import IngredientFilter, RecipeFilter
+from .pagination import CustomPagination, RecipePagination, UserPagination
+from .payloads import ensure_payload, recipe_etag
 from .permissions import IsAuthorOrAdminOrReadOnly
+from .relations import Relation
+from .renderers import CSVRenderer, PlainTextRenderer
 from .serializers import (
+    BulkIdsSerializer,
+    CookableQuerySerializer,
+    CookableRecipeSerializer,
     FollowerSerializer,
     IngredientSerializer,
     RecipeMinified,
     RecipeSerializerRead,
     RecipeSerializerWrite,
     TagSerializer,
+    get_recipes_limit,
+)
+from .shopping_cart import WRITERS, cart_etag, cart_totals
+
+favorites = Relation(Recipe.favorited.through, 'recipe', 'favorites_count')
+shopping_carts = Relation(
+    Recipe.shopping_cart.through, 'recipe', 'in_carts_count'
 )
+follows = Relation(Follow, 'following', 'followers_count')
+
+
+def bulk_relation_response(request, relation):
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = serializer.validated_data['ids']
+    if request.method == 'DELETE':
+        results = relation.remove_many(request.user, ids)
+    else:
+        results = relation.add_many(request.user, ids)
+    return Response(
+        {
+            'results': [
+                {'id': target_id, 'status': result}
+                for target_id, result in results.items()
+            ]
+        }
+    )
 
 
 class UserViewSet(views.UserViewSet):
     http_method_names = ['get', 'post', 'delete']
+    pagination_class = UserPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        user = self.request.user
+        if user.is_authenticated:
+            is_subscribed = Exists(
+                Follow.objects.filter(user=user, following=OuterRef('pk'))
+            )
+        else:
+            is_subscribed = Value(False, output_field=BooleanField())
+        return queryset.only(
+            'id', 'email', 'username', 'first_name', 'last_name'
+        ).annotate(is_subscribed=is_subscribed)
+
+    def get_instance(self):
+        user = super().get_instance()
+        # Users cannot follow themselves.
+        user.is_subscribed = False
+        return user
 
     @action(detail=False, serializer_class=FollowerSerializer)
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=self.request.user)
+        recipes_limit = get_recipes_limit(request)
+        queryset = (
+            User.objects.filter(following__user=self.request.user)
+            .annotate(is_subscribed=Value(True, output_field=BooleanField()))
+            .order_by('username')
+        )
         page = self.paginate_queryset(queryset)
+        previews = defaultdict(list)
+        for recipe in Recipe.objects.previews_for_authors(
+            page, recipes_limit
+        ):
+            previews[recipe.author_id].append(recipe)
+        for author in page:
+            author.recipe_previews = previews[author.id]
+        if settings.FAST_SERIALIZERS:
+            return self.get_paginated_response(
+                [follower_dict(author) for author in page]
+            )
         serializer = self.get_serializer(page, many=True)
         return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'], serializer_class=FollowerSerializer)
     def subscribe(self, request, id):
         following = get_object_or_404(User, id=id)
-        serializer = self.get_serializer(following)
-        if following.following.filter(user=request.user).exists():
-            raise ValidationError('Такая подписка уже существует')
         if request.user == following:
             raise ValidationError('Нельзя подписаться на самого себя')
-        Follow.objects.create(following=following, user=request.user)
+        if not follows.add(request.user, following.pk):
+            raise ValidationError('Такая подписка уже существует')
+        following.is_subscribed = True
+        serializer = self.get_serializer(following)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, id):
-        following = get_object_or_404(User, id=id)
-        follow = following.following.filter(user=request.user)
-        if not follow.exists():
+        if not follows.remove(request.user, id):
+            get_object_or_404(User, id=id)
             raise ValidationError('Такой подписки не существует')
-        follow.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post', 'delete'], url_path='subscribe')
+    def subscribe_many(self, request):
+        return bulk_relation_response(request, follows)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    CachedResponseMixin, viewsets.ReadOnlyModelViewSet
+):
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+        if settings.INGREDIENT_SEARCH_IN_MEMORY and cache_is_shared():
+            return Response(ingredient_lookup.search(name, limit))
+        return self.cached_response(self.search, request)
+
+    def search(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(
+            queryset[: settings.INGREDIENT_SEARCH_LIMIT], many=True
+        )
+        return Response(serializer.data)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete']
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve', 'popular'):
+            queryset = queryset.with_user_flags(self.request.user)
+            if self.uses_payload():
+                return queryset.with_payload()
+            if self.caches_recipes():
+                return queryset.only('id', 'author_id', 'pub_date')
+            return queryset.with_related()
+        return queryset
+
+    def caches_recipes(self):
+        return settings.RECIPE_CACHE_ENABLED and cache_is_shared()
+
+    def render_recipes(self, recipes):
+        if self.caches_recipes():
+            return render_recipes(self.request, recipes)
+        if settings.FAST_SERIALIZERS:
+            return [recipe_dict(recipe, self.request) for recipe in recipes]
+        return self.get_serializer(recipes, many=True).data
+
+    def list_recipes(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.render_recipes(list(queryset)))
+        return self.get_paginated_response(self.render_recipes(page))
+
+    def list(self, request, *args, **kwargs):
+        return self.list_recipes(self.filter_queryset(self.get_queryset()))
+
+    def uses_payload(self):
+        return (
+            settings.RECIPE_PAYLOADS_ENABLED
+            and self.action == 'retrieve'
+            and self.request.accepted_renderer.format == 'json'
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.uses_payload():
+            return Response(self.render_recipes([self.get_object()])[0])
+        recipe = self.get_object()
+        etag = recipe_etag(recipe)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(
+                recipe_dict(recipe, request, ensure_payload(recipe))
+            )
+        response['ETag'] = etag
+        return response
 
     def get_serializer_class(self):
         if self.request.method in ('POST', 'PATCH'):
@@ -86,52 +240,107 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], serializer_class=RecipeMinified)
     def shopping_cart(self, request, pk):
         recipe = get_object_or_404(Recipe, pk=pk)
-        if recipe.shopping_cart.filter(id=request.user.id).exists():
+        if not shopping_carts.add(request.user, recipe.pk):
             raise ValidationError('Рецепт уже добавлен в список покупок')
-        recipe.shopping_cart.add(request.user)
         serializer = self.serializer_class(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @shopping_cart.mapping.delete
     def delete_from_shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        if not recipe.shopping_cart.filter(id=request.user.id).exists():
+        if not shopping_carts.remove(request.user, pk):
+            get_object_or_404(Recipe, pk=pk)
             raise ValidationError('Рецепта нет в списке покупок')
-        recipe.shopping_cart.remove(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False, methods=['post', 'delete'], url_path='shopping_cart'
+    )
+    def shopping_cart_many(self, request):
+        return bulk_relation_response(request, shopping_carts)
+
     @action(detail=True, methods=['post'], serializer_class=RecipeMinified)
     def favorite(self, request, pk):
         recipe = get_object_or_404(Recipe, pk=pk)
-        if recipe.favorited.filter(id=request.user.id).exists():
+        if not favorites.add(request.user, recipe.pk):
             raise ValidationError('Рецепт уже добавлен в избранное')
-        recipe.favorited.add(request.user)
         serializer = self.serializer_class(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @favorite.mapping.delete
     def delete_from_favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        if not recipe.favorited.filter(id=request.user.id).exists():
+        if not favorites.remove(request.user, pk):
+            get_object_or_404(Recipe, pk=pk)
             raise ValidationError('Рецепта нет в избранном')
-        recipe.favorited.remove(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, permission_classes=(IsAuthenticated,))
-    def download_shopping_cart(self, request):
-        ingredients = Ingredient.objects.filter(
-            recipes__shopping_cart=request.user
-        ).annotate(total=Sum('recipeingredients__amount'))
-        lines = [
-            f'{i.name}: {i.total} {i.measurement_unit}\n' for i in ingredients
-        ]
-
-        return HttpResponse(
-            lines,
-            content_type='text/plain',
-            headers={
-                'Content-Disposition': (
-                    'attachment; filename="shopping_cart.txt"'
+    @action(detail=False, methods=['post', 'delete'], url_path='favorite')
+    def favorite_many(self, request):
+        return bulk_relation_response(request, favorites)
+
+    @action(detail=False, pagination_class=CustomPagination)
+    def popular(self, request):
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .filter(popularity__isnull=False)
+            .order_by('-popularity__score', '-popularity__recipe_id')
+        )
+        return self.list_recipes(queryset)
+
+    @action(detail=False)
+    def cookable(self, request):
+        query = CookableQuerySerializer(
+            data={
+                'ingredients': [
+                    value
+                    for values in request.query_params.getlist('ingredients')
+                    for value in values.split(',')
+                ],
+                'limit': request.query_params.get(
+                    'limit', settings.COOKABLE_LIMIT
                 ),
-            },
+            }
+        )
+        query.is_valid(raise_exception=True)
+        ranking = cookable_index.search(
+            query.validated_data['ingredients'],
+            query.validated_data['limit'],
         )
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'cooking_time'
+        ).in_bulk(
+            [recipe_id for recipe_id, _, _ in ranking]
+        )
+        results = []
+        for recipe_id, matched, total in ranking:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = round(matched / total, 3)
+            recipe.missing = total - matched
+            results.append(recipe)
+        serializer = CookableRecipeSerializer(
+            results, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer),
+    )
+    def download_shopping_cart(self, request):
+        format = request.accepted_renderer.format
+        etag = cart_etag(request.user, format)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = StreamingHttpResponse(
+                WRITERS[format](cart_totals(request.user)),
+                content_type=request.accepted_renderer.media_type,
+                headers={
+                    'Content-Disposition': (
+                        f'attachment; filename="shopping_cart.{format}"'
+                    ),
+                },
+            )
+        response['ETag'] = etag
+        return response
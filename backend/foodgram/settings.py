@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,6 +69,7 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
         'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
     }
 }
 
@@ -121,6 +123,79 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+INGREDIENT_SEARCH_IN_MEMORY = (
+    os.getenv('INGREDIENT_SEARCH_IN_MEMORY', 'False') == 'True'
+)
+BULK_RELATION_MAX_IDS = int(os.getenv('BULK_RELATION_MAX_IDS', 100))
+
+RECIPE_IMAGE_MAX_BYTES = int(os.getenv('RECIPE_IMAGE_MAX_BYTES', 10 * 2**20))
+RECIPE_IMAGE_MAX_PIXELS = int(os.getenv('RECIPE_IMAGE_MAX_PIXELS', 40_000_000))
+RECIPE_IMAGE_WIDTHS = (320, 640, 1280)
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_QUEUE_SIZE = int(os.getenv('RECIPE_IMAGE_QUEUE_SIZE', 32))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_LOCAL_SIZE = int(os.getenv('RESPONSE_CACHE_LOCAL_SIZE', 512))
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 86400))
+RESPONSE_CACHE_LOCAL_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_LOCAL_TIMEOUT', 5)
+)
+
+RECIPE_CACHE_ENABLED = os.getenv('RECIPE_CACHE_ENABLED', 'False') == 'True'
+FAST_SERIALIZERS = os.getenv('FAST_SERIALIZERS', 'False') == 'True'
+RECIPE_PAYLOADS_ENABLED = (
+    os.getenv('RECIPE_PAYLOADS_ENABLED', 'False') == 'True'
+)
+
+AUTH_TOKEN_CACHE_ENABLED = (
+    os.getenv('AUTH_TOKEN_CACHE_ENABLED', 'False') == 'True'
+)
+AUTH_TOKEN_CACHE_ALIAS = os.getenv('AUTH_TOKEN_CACHE_ALIAS') or None
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 4096))
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+AUTH_TOKEN_LOCAL_TIMEOUT = int(os.getenv('AUTH_TOKEN_LOCAL_TIMEOUT', 5))
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', 8))
+
+COOKABLE_LIMIT = int(os.getenv('COOKABLE_LIMIT', 20))
+COOKABLE_REPLAY_LIMIT = int(os.getenv('COOKABLE_REPLAY_LIMIT', 1000))
+COOKABLE_LOCAL_TIMEOUT = int(os.getenv('COOKABLE_LOCAL_TIMEOUT', 30))
+
+POPULARITY_HALF_LIFE_HOURS = float(os.getenv('POPULARITY_HALF_LIFE_HOURS', 72))
+POPULARITY_FAVORITE_WEIGHT = 1.0
+POPULARITY_CART_WEIGHT = 0.5
+POPULARITY_MIN_SCORE = 0.01
+
+PAGINATION_COUNT_TIMEOUT = int(os.getenv('PAGINATION_COUNT_TIMEOUT', 30))
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+REQUEST_BUDGETS = {
+    'recipe-list': {'queries': 6, 'duplicates': 0},
+    'recipe-detail': {'queries': 6, 'duplicates': 0},
+    'recipe-popular': {'queries': 6, 'duplicates': 0},
+    'recipe-cookable': {'queries': 3, 'duplicates': 0},
+    'user-subscriptions': {'queries': 5, 'duplicates': 0},
+    'user-list': {'queries': 3, 'duplicates': 0},
+    'user-detail': {'queries': 2},
+    'user-me': {'queries': 1},
+    'tag-list': {'queries': 2},
+    'ingredient-list': {'queries': 2},
+    'recipe-download-shopping-cart': {'queries': 4},
+}
+
 DJOSER = {
     'PERMISSIONS': {
         'user_list': ['rest_framework.permissions.AllowAny'],
@@ -140,11 +215,15 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPagination',
     'PAGE_SIZE': 6,
 }
@@ -25,12 +25,8 @@ class RecipeIngredientInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorite_count')
-    readonly_fields = ('favorite_count',)
+    list_display = ('name', 'author', 'favorites_count', 'in_carts_count')
+    readonly_fields = ('favorites_count', 'in_carts_count')
     list_filter = ('name', 'author', 'tags')
     empty_value_display = '-пусто-'
     inlines = [RecipeIngredientInline]
-
-    @admin.display(description="Добавлено в избранное")
-    def favorite_count(self, obj):
-        return obj.favorited.count()
@@ -0,0 +1,74 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(settings.RECIPE_IMAGE_QUEUE_SIZE)
+
+
+# The storage keeps full names unique, while stems repeat: every upload
+# is saved as temp.<ext>.
+def variant_name(name, width):
+    path = PurePosixPath(name)
+    return str(path.parent / 'variants' / f'{path.name}_{width}.webp')
+
+
+def variant_urls(name):
+    return {
+        str(width): default_storage.url(variant_name(name, width))
+        for width in settings.RECIPE_IMAGE_WIDTHS
+    }
+
+
+def make_variants(name):
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image.load()
+        mode = 'RGBA' if 'A' in image.getbands() else 'RGB'
+        image = image.convert(mode)
+        for width in settings.RECIPE_IMAGE_WIDTHS:
+            variant = image.copy()
+            variant.thumbnail((width, variant.height))
+            buffer = BytesIO()
+            variant.save(buffer, 'WEBP', quality=80)
+            target = variant_name(name, width)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def _run(name):
+    try:
+        make_variants(name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+    finally:
+        _slots.release()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-images',
+            )
+    return _executor
+
+
+def schedule_variants(name):
+    # Runs in on_commit after the response is built; never wait here.
+    if not _slots.acquire(blocking=False):
+        logger.warning('Очередь изображений переполнена, пропущено %s', name)
+        return
+    get_executor().submit(_run, name)
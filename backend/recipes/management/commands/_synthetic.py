@@ -0,0 +1,141 @@
+import random
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import Follow, User
+
+BATCH_SIZE = 1000
+
+
+def sample(rng, population, size):
+    return rng.sample(population, min(size, len(population)))
+
+
+def generate(
+    users=50,
+    recipes=1000,
+    tags=10,
+    ingredients=500,
+    ingredients_per_recipe=8,
+    tags_per_recipe=3,
+    follows=5,
+    favorites=20,
+    cart=5,
+    seed=0,
+):
+    rng = random.Random(seed)
+    prefix = f'bench{rng.randrange(10**9)}'
+    User.objects.bulk_create(
+        (
+            User(
+                email=f'{prefix}_{i}@example.com',
+                username=f'{prefix}_{i}',
+                first_name='Bench',
+                last_name=str(i),
+                password='!',
+            )
+            for i in range(users)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(
+        User.objects.filter(username__startswith=f'{prefix}_').values_list(
+            'pk', flat=True
+        )
+    )
+    Tag.objects.bulk_create(
+        Tag(name=f'{prefix} {i}', color='#%06x' % i, slug=f'{prefix}-{i}')
+        for i in range(tags)
+    )
+    ingredient_names = [
+        f'{prefix} ингредиент {i}' for i in range(ingredients)
+    ]
+    Ingredient.objects.bulk_create(
+        (
+            Ingredient(name=name, measurement_unit='г')
+            for name in ingredient_names
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Recipe.objects.bulk_create(
+        (
+            Recipe(
+                name=f'{prefix} рецепт {i}',
+                author_id=rng.choice(user_ids),
+                text=' '.join(
+                    rng.choice(ingredient_names) for _ in range(20)
+                ),
+                cooking_time=rng.randint(1, 180),
+                image='recipes/images/bench.png',
+            )
+            for i in range(recipes)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    recipe_ids = list(
+        Recipe.objects.filter(name__startswith=f'{prefix} ').values_list(
+            'pk', flat=True
+        )
+    )
+    tag_ids = list(
+        Tag.objects.filter(slug__startswith=f'{prefix}-').values_list(
+            'pk', flat=True
+        )
+    )
+    ingredient_ids = list(
+        Ingredient.objects.filter(name__startswith=prefix).values_list(
+            'pk', flat=True
+        )
+    )
+    Recipe.tags.through.objects.bulk_create(
+        (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in sample(rng, tag_ids, tags_per_recipe)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    RecipeIngredient.objects.bulk_create(
+        (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in sample(
+                rng, ingredient_ids, ingredients_per_recipe
+            )
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Follow.objects.bulk_create(
+        (
+            Follow(user_id=user_id, following_id=following_id)
+            for user_id in user_ids
+            for following_id in sample(rng, user_ids, follows)
+            if following_id != user_id
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    for through, size in (
+        (Recipe.favorited.through, favorites),
+        (Recipe.shopping_cart.through, cart),
+    ):
+        through.objects.bulk_create(
+            (
+                through(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in sample(rng, recipe_ids, size)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    call_command('recount_counters', stdout=StringIO())
+    return {
+        'users': user_ids,
+        'recipes': recipe_ids,
+        'tags': tag_ids,
+        'ingredients': ingredient_ids,
+    }
@@ -0,0 +1,234 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Tag
+
+from ._synthetic import generate
+
+GENERATOR_OPTIONS = (
+    'users',
+    'recipes',
+    'tags',
+    'ingredients',
+    'ingredients_per_recipe',
+    'tags_per_recipe',
+    'follows',
+    'favorites',
+    'cart',
+    'seed',
+)
+
+
+def percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+ENDPOINTS = {
+    'recipes': '/api/recipes/',
+    'recipes_by_tag': '/api/recipes/?tags={tag}',
+    'recipes_favorited': '/api/recipes/?is_favorited=1',
+    'recipes_cursor': '/api/recipes/?cursor=',
+    'recipe_detail': '/api/recipes/{recipe}/',
+    'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+    'users': '/api/users/',
+    'users_cursor': '/api/users/?cursor=',
+    'user_detail': '/api/users/{user}/',
+    'me': '/api/users/me/',
+    'tags': '/api/tags/',
+    'ingredients_search': '/api/ingredients/?name={ingredient}',
+    'shopping_cart_txt': '/api/recipes/download_shopping_cart/',
+}
+
+BASELINE = settings.BASE_DIR / 'data' / 'benchmark_api_baseline.json'
+
+
+def endpoints(data, names):
+    ingredient = Ingredient.objects.get(pk=data['ingredients'][0]).name
+    params = {
+        'recipe': data['recipes'][0],
+        'tag': Tag.objects.get(pk=data['tags'][0]).slug,
+        'ingredient': ingredient[:12],
+        'user': data['users'][1],
+    }
+    return {name: ENDPOINTS[name].format(**params) for name in names}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main API endpoints on synthetic data and compare '
+        'with a saved baseline; all generated rows are rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--ingredients', type=int, default=1000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--follows', type=int, default=10)
+        parser.add_argument('--favorites', type=int, default=30)
+        parser.add_argument('--cart', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--runs', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=ENDPOINTS,
+            help='Benchmark only these endpoints',
+        )
+        parser.add_argument('--save', help='Write results to a JSON file')
+        parser.add_argument(
+            '--baseline',
+            help=f'Compare with results saved by --save, e.g. {BASELINE}',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Relative p95 slowdown reported as a regression',
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error when a regression is found',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            data = generate(
+                **{name: options[name] for name in GENERATOR_OPTIONS}
+            )
+            client = self.make_client(data)
+            urls = endpoints(data, options['only'] or ENDPOINTS)
+            results = {
+                name: self.measure(
+                    client, url, options['runs'], options['warmup']
+                )
+                for name, url in urls.items()
+            }
+            transaction.set_rollback(True)
+        self.report(results)
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(
+                    {
+                        'database': connection.vendor,
+                        'options': {
+                            name: options[name] for name in GENERATOR_OPTIONS
+                        },
+                        'results': results,
+                    },
+                    file,
+                    indent=2,
+                )
+        if options['baseline']:
+            regressions = self.compare(
+                results, options['baseline'], options['threshold']
+            )
+            if regressions and options['fail_on_regression']:
+                raise CommandError(
+                    'Регрессия производительности: ' + ', '.join(regressions)
+                )
+
+    def make_client(self, data):
+        token = Token.objects.create(user_id=data['users'][0])
+        return Client(
+            HTTP_AUTHORIZATION=f'Token {token.key}',
+            HTTP_HOST=next(
+                (
+                    host
+                    for host in settings.ALLOWED_HOSTS
+                    if host not in ('*', '')
+                ),
+                'localhost',
+            ),
+        )
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: статус {response.status_code}')
+        if response.streaming:
+            return sum(len(chunk) for chunk in response.streaming_content)
+        return len(response.content)
+
+    def measure(self, client, url, runs, warmup):
+        for _ in range(warmup):
+            self.request(client, url)
+        timings, queries = [], []
+        for _ in range(runs):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                size = self.request(client, url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+        tracemalloc.start()
+        try:
+            self.request(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        timings.sort()
+        return {
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'queries': statistics.median(queries),
+            'peak_kib': round(peak / 1024, 1),
+            'bytes': size,
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"endpoint":<20} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"queries":>7} {"peak KiB":>9} {"bytes":>8}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<20} {result["p50_ms"]:>8.2f} '
+                f'{result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f} '
+                f'{result["queries"]:>7g} {result["peak_kib"]:>9.1f} '
+                f'{result["bytes"]:>8}'
+            )
+
+    def compare(self, results, path, threshold):
+        with open(path) as file:
+            saved = json.load(file)
+        if saved.get('database', connection.vendor) != connection.vendor:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Базовый прогон сделан на {saved["database"]}, '
+                    f'текущий на {connection.vendor}'
+                )
+            )
+        baseline = saved['results']
+        self.stdout.write(
+            f'\n{"endpoint":<20} {"p50":>8} {"p95":>8} {"queries":>9}'
+        )
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            p50 = result['p50_ms'] / before['p50_ms'] - 1
+            p95 = result['p95_ms'] / before['p95_ms'] - 1
+            queries = result['queries'] - before['queries']
+            regressed = p95 > threshold or queries > 0
+            if regressed:
+                regressions.append(name)
+            line = f'{name:<20} {p50:>+8.0%} {p95:>+8.0%} {queries:>+9g}'
+            self.stdout.write(
+                self.style.ERROR(line) if regressed else line
+            )
+        return regressions
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.test.utils import override_settings
+
+from api.authentication import local_tokens
+
+from . import benchmark_api
+from ._synthetic import generate
+
+ENDPOINTS = (
+    'me',
+    'tags',
+    'recipes',
+    'recipe_detail',
+    'subscriptions',
+    'shopping_cart_txt',
+)
+
+
+class Command(benchmark_api.Command):
+    help = (
+        'Compare queries and latency per request with and without the '
+        'token authentication cache; all generated rows are rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--runs', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--only', nargs='+', help='Benchmark only these endpoints'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            data = generate(users=options['users'], recipes=options['recipes'])
+            client = self.make_client(data)
+            urls = benchmark_api.endpoints(data)
+            self.stdout.write(
+                f'{"endpoint":<20} {"queries":>7} {"cached":>7} {"saved":>6} '
+                f'{"p50 ms":>8} {"cached":>8}'
+            )
+            for name in options['only'] or ENDPOINTS:
+                results = []
+                for enabled in (False, True):
+                    local_tokens.clear()
+                    with override_settings(AUTH_TOKEN_CACHE_ENABLED=enabled):
+                        results.append(
+                            self.measure(
+                                client,
+                                urls[name],
+                                options['runs'],
+                                options['warmup'],
+                            )
+                        )
+                before, after = results
+                self.stdout.write(
+                    f'{name:<20} {before["queries"]:>7g} '
+                    f'{after["queries"]:>7g} '
+                    f'{before["queries"] - after["queries"]:>6g} '
+                    f'{before["p50_ms"]:>8.2f} {after["p50_ms"]:>8.2f}'
+                )
+            transaction.set_rollback(True)
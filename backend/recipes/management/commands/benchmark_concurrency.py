@@ -0,0 +1,224 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from types import ModuleType
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import include, path
+from rest_framework.authtoken.models import Token
+
+from api.urls import async_urlpatterns, sync_urlpatterns
+from recipes.models import Ingredient, Tag
+from users.models import User
+
+from ._synthetic import generate
+from .benchmark_api import GENERATOR_OPTIONS, endpoints, percentile
+
+ENDPOINTS = (
+    'recipes',
+    'recipes_by_tag',
+    'recipe_detail',
+    'subscriptions',
+    'tags',
+    'ingredients_search',
+)
+
+
+def urlconf(patterns):
+    module = ModuleType('benchmark_urls')
+    module.urlpatterns = [path('api/', include(patterns))]
+    return module
+
+
+def add_latency(seconds):
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(connection, **kwargs):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+    for connection in connections.all():
+        install(connection)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/sec of the sync WSGI worker and the async views '
+        'under ASGI on synthetic data; generated rows are committed while '
+        'the benchmark runs and deleted afterwards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--follows', type=int, default=10)
+        parser.add_argument('--favorites', type=int, default=30)
+        parser.add_argument('--cart', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument(
+            '--wsgi-threads',
+            type=int,
+            default=1,
+            help='Threads of the WSGI worker, 1 for a sync worker',
+        )
+        parser.add_argument(
+            '--db-latency',
+            type=float,
+            default=0,
+            help='Milliseconds added to every query to model network '
+            'round trips to the database',
+        )
+        parser.add_argument(
+            '--only', nargs='+', help='Benchmark only these endpoints'
+        )
+
+    def handle(self, *args, **options):
+        data = generate(**{name: options[name] for name in GENERATOR_OPTIONS})
+        try:
+            self.run(data, options)
+        finally:
+            User.objects.filter(pk__in=data['users']).delete()
+            Tag.objects.filter(pk__in=data['tags']).delete()
+            Ingredient.objects.filter(pk__in=data['ingredients']).delete()
+
+    def run(self, data, options):
+        token = Token.objects.create(user_id=data['users'][0]).key
+        urls = endpoints(data)
+        urls = [urls[name] for name in options['only'] or ENDPOINTS]
+        requests = list(islice(cycle(urls), options['requests']))
+        if options['db_latency']:
+            add_latency(options['db_latency'] / 1000)
+        host = next(
+            (
+                host
+                for host in settings.ALLOWED_HOSTS
+                if host not in ('*', '') and not host.startswith('.')
+            ),
+            'localhost',
+        )
+        modes = {
+            f'wsgi x{options["wsgi_threads"]}': (
+                sync_urlpatterns,
+                lambda: self.run_wsgi(
+                    requests, options['wsgi_threads'], host, token
+                ),
+            ),
+            f'asgi c{options["concurrency"]}': (
+                async_urlpatterns + sync_urlpatterns,
+                lambda: asyncio.run(
+                    self.run_asgi(
+                        requests, options['concurrency'], host, token
+                    )
+                ),
+            ),
+        }
+        self.stdout.write(
+            f'{"mode":<10} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8}'
+        )
+        bodies = {}
+        for mode, (patterns, run) in modes.items():
+            with override_settings(ROOT_URLCONF=urlconf(patterns)):
+                run()
+                start = time.perf_counter()
+                results = run()
+                elapsed = time.perf_counter() - start
+            failed = {
+                url
+                for url, status, _, body in results
+                if status != 200 or bodies.setdefault(url, body) != body
+            }
+            if failed:
+                raise CommandError(
+                    f'{mode}: ошибки или расхождения ответов на '
+                    + ', '.join(sorted(failed))
+                )
+            timings = sorted(timing for _, _, timing, _ in results)
+            self.stdout.write(
+                f'{mode:<10} {len(results) / elapsed:>8.1f} '
+                f'{statistics.median(timings):>8.2f} '
+                f'{percentile(timings, 0.95):>8.2f}'
+            )
+
+    def run_wsgi(self, requests, threads, host, token):
+        handler = WSGIHandler()
+
+        def call(url):
+            path, _, query = url.partition('?')
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'QUERY_STRING': query,
+                'HTTP_HOST': host,
+                'HTTP_AUTHORIZATION': f'Token {token}',
+            }
+            setup_testing_defaults(environ)
+            statuses = []
+            start = time.perf_counter()
+            response = handler(
+                environ, lambda status, headers: statuses.append(status)
+            )
+            body = b''.join(response)
+            response.close()
+            timing = (time.perf_counter() - start) * 1000
+            return url, int(statuses[0].split()[0]), timing, body
+
+        with ThreadPoolExecutor(threads) as executor:
+            return list(executor.map(call, requests))
+
+    async def run_asgi(self, requests, concurrency, host, token):
+        handler = ASGIHandler()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def call(url):
+            path, _, query = url.partition('?')
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': query.encode(),
+                'root_path': '',
+                'headers': [
+                    (b'host', host.encode()),
+                    (b'authorization', f'Token {token}'.encode()),
+                ],
+                'client': ('127.0.0.1', 0),
+                'server': (host, 80),
+            }
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            async with semaphore:
+                start = time.perf_counter()
+                await handler(scope, receive, send)
+                timing = (time.perf_counter() - start) * 1000
+            body = b''.join(message.get('body', b'') for message in messages)
+            return url, messages[0]['status'], timing, body
+
+        return await asyncio.gather(*map(call, requests))
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from recipes.models import Ingredient, Recipe
+
+from ._synthetic import generate
+from .benchmark_tag_filter import measure
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure recipe search latency on synthetic data; '
+        'all generated rows are rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options['recipes'], options['runs'])
+            transaction.set_rollback(True)
+
+    def run(self, recipes, runs):
+        data = generate(
+            users=100,
+            recipes=recipes,
+            tags=10,
+            ingredients=2000,
+            ingredients_per_recipe=8,
+            follows=0,
+            favorites=0,
+            cart=0,
+        )
+        if Recipe.objects.supports_search():
+            start = time.perf_counter()
+            Recipe.objects.filter(
+                search_vector__isnull=True
+            ).update_search_vectors()
+            self.stdout.write(
+                f'indexed {recipes} recipes in '
+                f'{time.perf_counter() - start:.1f}s'
+            )
+        else:
+            self.stdout.write(
+                'full-text search needs PostgreSQL, '
+                'measuring the icontains fallback only'
+            )
+        word = Ingredient.objects.get(pk=data['ingredients'][0]).name
+        cases = {
+            'search': lambda: Recipe.objects.search(word),
+            'icontains': lambda: Recipe.objects.filter(
+                Q(name__icontains=word) | Q(text__icontains=word)
+            ),
+        }
+        self.stdout.write(
+            f'{"mode":>10} {"rows":>7} {"median ms":>10} {"p95 ms":>8}'
+        )
+        for mode, queryset in cases.items():
+
+            def run():
+                list(queryset().values_list('pk', flat=True)[:6])
+
+            median, p95 = measure(run, runs)
+            rows = queryset().count()
+            self.stdout.write(
+                f'{mode:>10} {rows:>7} {median:>10.2f} {p95:>8.2f}'
+            )
@@ -0,0 +1,87 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.http import QueryDict
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe, Tag
+
+from ._synthetic import generate
+
+
+def measure(func, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure tag filter latency on synthetic data; '
+        'all generated rows are rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, nargs='+', default=[1000, 5000, 20000]
+        )
+        parser.add_argument('--tags', type=int, nargs='+', default=[5, 50])
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"recipes":>8} {"tags":>5} {"mode":>8} {"rows":>6} '
+            f'{"median ms":>10} {"p95 ms":>8}'
+        )
+        for recipes in options['recipes']:
+            for tags in options['tags']:
+                with transaction.atomic():
+                    self.run_case(recipes, tags, options['runs'])
+                    transaction.set_rollback(True)
+
+    def run_case(self, recipes, tags, runs):
+        data = generate(
+            users=20,
+            recipes=recipes,
+            tags=tags,
+            ingredients=50,
+            ingredients_per_recipe=2,
+            tags_per_recipe=3,
+            follows=0,
+            favorites=0,
+            cart=0,
+        )
+        slugs = list(
+            Tag.objects.filter(pk__in=data['tags'][:3]).values_list(
+                'slug', flat=True
+            )
+        )
+        legacy = Recipe.objects.filter(tags__slug__in=slugs).distinct()
+        cases = {
+            'distinct': legacy,
+            'any': self.filtered(slugs, 'any'),
+            'all': self.filtered(slugs[:2], 'all'),
+        }
+        for mode, queryset in cases.items():
+
+            def run():
+                queryset.count()
+                list(queryset.values_list('pk', flat=True)[:6])
+
+            median, p95 = measure(run, runs)
+            self.stdout.write(
+                f'{recipes:>8} {tags:>5} {mode:>8} {queryset.count():>6} '
+                f'{median:>10.2f} {p95:>8.2f}'
+            )
+
+    def filtered(self, slugs, match):
+        data = QueryDict(mutable=True)
+        data.setlist('tags', slugs)
+        data['tags_match'] = match
+        return RecipeFilter(data, queryset=Recipe.objects.all()).qs
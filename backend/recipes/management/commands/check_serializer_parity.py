@@ -0,0 +1,104 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast import follower_dict, recipe_dict
+from api.renderers import FastJSONRenderer
+from api.serializers import FollowerSerializer, RecipeSerializerRead
+from recipes.models import Recipe
+from users.models import User
+
+from ._synthetic import generate
+
+
+def make_request(user, path):
+    request = Request(APIRequestFactory().get(path))
+    request.user = user
+    return request
+
+
+class Command(BaseCommand):
+    help = (
+        'Check that the fast serializers and renderer produce the same '
+        'bytes as the DRF serializers; all generated rows are rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            mismatches = self.find_mismatches(options['recipes'])
+            transaction.set_rollback(True)
+        if mismatches:
+            raise CommandError('Расхождения: ' + ', '.join(mismatches))
+        self.stdout.write(self.style.SUCCESS('Вывод совпадает'))
+
+    def find_mismatches(self, recipes):
+        data = generate(users=20, recipes=recipes, follows=5)
+        Recipe.objects.filter(pk=data['recipes'][0]).update(
+            name='«Борщ» "с \\ кавычками" 🍲',
+            text='строка\u2028разделитель\u2029абзац\n\tи </script>',
+        )
+        mismatches = []
+        for user in (AnonymousUser(), User.objects.get(pk=data['users'][0])):
+            request = make_request(user, '/api/recipes/')
+            page = list(
+                Recipe.objects.filter(pk__in=data['recipes'])
+                .with_related()
+                .with_user_flags(user)
+            )
+            mismatches += self.compare(
+                f'recipes ({user})',
+                RecipeSerializerRead(
+                    page, many=True, context={'request': request}
+                ).data,
+                [recipe_dict(recipe, request) for recipe in page],
+            )
+            if not user.is_authenticated:
+                continue
+            authors = list(
+                User.objects.filter(following__user=user).annotate(
+                    is_subscribed=Value(True, output_field=BooleanField())
+                )
+            )
+            previews = defaultdict(list)
+            for recipe in Recipe.objects.previews_for_authors(authors, 3):
+                previews[recipe.author_id].append(recipe)
+            for author in authors:
+                author.recipe_previews = previews[author.id]
+            mismatches += self.compare(
+                'subscriptions',
+                FollowerSerializer(
+                    authors,
+                    many=True,
+                    context={'request': make_request(user, '/')},
+                ).data,
+                [follower_dict(author) for author in authors],
+            )
+        return mismatches
+
+    def compare(self, name, expected, actual):
+        reference = JSONRenderer().render(expected)
+        outputs = {
+            'fast serializer': JSONRenderer().render(actual),
+            'fast renderer': FastJSONRenderer().render(expected),
+            'fast serializer + renderer': FastJSONRenderer().render(actual),
+        }
+        mismatches = []
+        for variant, output in outputs.items():
+            same = output == reference
+            self.stdout.write(
+                f'{name}: {variant}: '
+                + ('ok' if same else 'MISMATCH')
+                + f' ({len(reference)} bytes)'
+            )
+            if not same:
+                mismatches.append(f'{name}: {variant}')
+        return mismatches
@@ -1,23 +1,137 @@
 import csv
+import json
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from api.cache import bump_version
 from recipes.models import Ingredient
 
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        if len(row) < 2:
+            raise CommandError(
+                f'Строка {reader.line_num}: ожидались название и единица '
+                'измерения'
+            )
+        yield row[0], row[1]
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != '[':
+                    raise CommandError('Ожидался JSON-массив ингредиентов')
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer[:1] == ',':
+                buffer = buffer[1:].lstrip()
+            if buffer[:1] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise CommandError('Некорректный JSON')
+                break
+            buffer = buffer[end:]
+            yield item['name'], item['measurement_unit']
+        if not chunk:
+            raise CommandError('Некорректный JSON')
+
+
+READERS = {'csv': read_csv, 'json': read_json}
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
 
 class Command(BaseCommand):
-    help = 'Transfer from csv to database'
+    help = (
+        'Import ingredients from csv or json, adding rows that are not in '
+        'the database yet'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.BASE_DIR / 'data' / 'ingredients.csv'
+        )
+        parser.add_argument('--format', choices=READERS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing',
+        )
 
     def handle(self, *args, **options):
-        csv_path = settings.BASE_DIR / 'data'
-        csv_files = ['ingredients.csv']
-        model_list = [Ingredient]
-        for csv_file, model in zip(csv_files, model_list):
-            with open(csv_path / csv_file, encoding='UTF-8') as file:
-                reader = csv.reader(file)
-                model.objects.all().delete()
-                model.objects.bulk_create(
-                    model(name=row[0], measurement_unit=row[1])
-                    for row in reader
+        path = str(options['path'])
+        format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        start = time.perf_counter()
+        with transaction.atomic(), open(path, encoding='UTF-8') as file:
+            seen = set()
+            created = existing = 0
+            for batch in batches(
+                READERS[format](file), options['batch_size']
+            ):
+                keys = {
+                    (name.strip(), unit.strip()) for name, unit in batch
+                } - seen
+                seen |= keys
+                found = set(
+                    Ingredient.objects.filter(
+                        name__in={name for name, _ in keys}
+                    ).values_list('name', 'measurement_unit')
                 )
+                new = sorted(keys - found)
+                existing += len(keys & found)
+                created += len(new)
+                if options['dry_run']:
+                    for name, unit in new:
+                        self.stdout.write(f'+ {name}, {unit}')
+                else:
+                    Ingredient.objects.bulk_create(
+                        (
+                            Ingredient(name=name, measurement_unit=unit)
+                            for name, unit in new
+                        ),
+                        ignore_conflicts=True,
+                    )
+            missing = Ingredient.objects.count() - existing
+            if not options['dry_run']:
+                missing -= created
+        elapsed = time.perf_counter() - start
+        if created and not options['dry_run']:
+            bump_version('ingredients')
+        verb = 'будет добавлено' if options['dry_run'] else 'добавлено'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Прочитано строк: {len(seen)}, {verb}: {created}, уже '
+                f'есть: {existing}, есть только в базе (оставлены): '
+                f'{missing}; {len(seen) / elapsed:.0f} строк/с'
+            )
+        )
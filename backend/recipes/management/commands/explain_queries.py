@@ -0,0 +1,132 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from api.shopping_cart import cart_summary
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+from ._synthetic import generate
+
+
+# Unique constraints are named differently by each backend.
+def alternatives(index):
+    return (index,) if isinstance(index, str) else index
+
+
+def cases(data):
+    user = User.objects.get(pk=data['users'][0])
+    author = data['users'][1]
+    latest = Favorite.objects.aggregate(latest=Max('created_at'))['latest']
+    return {
+        'feed': (
+            Recipe.objects.order_by('-pub_date', '-id')[:6],
+            ['recipe_pub_date_id_idx'],
+        ),
+        'author_feed': (
+            Recipe.objects.filter(author=author).order_by('-pub_date', '-id')[
+                :6
+            ],
+            ['recipe_author_pub_date_idx'],
+        ),
+        'favorited': (
+            Favorite.objects.filter(user=user)
+            .order_by()
+            .values_list('recipe_id'),
+            ['favorite_user_recipe_idx'],
+        ),
+        'in_cart': (
+            ShoppingCart.objects.filter(user=user)
+            .order_by()
+            .values_list('recipe_id'),
+            ['shoppingcart_user_recipe_idx'],
+        ),
+        'following': (
+            Follow.objects.filter(user=user)
+            .order_by()
+            .values_list('following_id'),
+            [('unique_pair', 'sqlite_autoindex_users_follow_1')],
+        ),
+        'followers': (
+            Follow.objects.filter(following=author)
+            .order_by()
+            .values_list('user_id'),
+            ['follow_following_user_idx'],
+        ),
+        'cart_summary': (
+            cart_summary(user),
+            ['shoppingcart_user_recipe_idx', 'recipe_ingredient_amount_idx'],
+        ),
+        'cart_etag': (
+            ShoppingCart.objects.filter(user=user)
+            .order_by('recipe_id')
+            .values_list('recipe_id', 'recipe__version'),
+            ['shoppingcart_user_recipe_idx'],
+        ),
+        'users_page': (
+            User.objects.order_by('username', 'id')[:6],
+            ['user_username_id_idx'],
+        ),
+        'popularity_window': (
+            Favorite.objects.filter(created_at__gte=latest).values_list(
+                'recipe_id', 'created_at'
+            ),
+            ['favorite_created_at_idx'],
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Check with EXPLAIN that the key queries use the expected indexes '
+        'on synthetic data; all generated rows are rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--only', nargs='+', help='Check only these queries'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            data = generate(
+                users=options['users'],
+                recipes=options['recipes'],
+                seed=options['seed'],
+            )
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            failed = self.check_plans(cases(data), options)
+            transaction.set_rollback(True)
+        if failed:
+            raise CommandError(
+                'Запросы без ожидаемых индексов: ' + ', '.join(failed)
+            )
+
+    def check_plans(self, queries, options):
+        failed = []
+        for name in options['only'] or queries:
+            if name not in queries:
+                raise CommandError(f'Неизвестный запрос: {name}')
+            queryset, indexes = queries[name]
+            plan = queryset.explain()
+            missing = [
+                index
+                for index in indexes
+                if not any(alias in plan for alias in alternatives(index))
+            ]
+            if missing:
+                failed.append(name)
+            self.stdout.write(
+                f'{name:<20} {"FAIL" if missing else "ok":<5} '
+                + ', '.join(
+                    ' | '.join(alternatives(index))
+                    for index in missing or indexes
+                )
+            )
+            if missing or options['verbosity'] > 1:
+                self.stdout.write(plan)
+        return failed
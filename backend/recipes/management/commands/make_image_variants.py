@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import make_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP variants for existing recipe images'
+
+    def handle(self, *args, **options):
+        names = (
+            Recipe.objects.exclude(image='')
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        for name in names.iterator():
+            try:
+                make_variants(name)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{name}: {error}')
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe
+from users.models import Follow, User
+
+
+def count_of(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized favorite, cart, recipe and follower counts'
+
+    def handle(self, *args, **options):
+        counters = (
+            (
+                Recipe,
+                {
+                    'favorites_count': count_of(
+                        Recipe.favorited.through, 'recipe'
+                    ),
+                    'in_carts_count': count_of(
+                        Recipe.shopping_cart.through, 'recipe'
+                    ),
+                },
+            ),
+            (
+                User,
+                {
+                    'recipes_count': count_of(Recipe, 'author'),
+                    'followers_count': count_of(Follow, 'following'),
+                },
+            ),
+        )
+        with transaction.atomic():
+            for model, fields in counters:
+                actual = {
+                    f'actual_{name}': expr for name, expr in fields.items()
+                }
+                drifted = (
+                    model.objects.annotate(**actual)
+                    .exclude(
+                        **{name: F(f'actual_{name}') for name in fields}
+                    )
+                    .count()
+                )
+                model.objects.update(**fields)
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}: '
+                    f'исправлено записей {drifted}'
+                )
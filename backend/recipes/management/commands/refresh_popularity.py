@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes.popularity import refresh_popularity
+
+
+class Command(BaseCommand):
+    help = (
+        'Update decayed recipe popularity scores with favorites and cart '
+        'additions since the previous run; meant to be run from cron'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild all scores, also dropping removed favorites',
+        )
+
+    def handle(self, *args, **options):
+        changed, removed = refresh_popularity(full=options['full'])
+        self.stdout.write(
+            f'Рецептов с новыми событиями: {changed}, '
+            f'удалено из рейтинга: {removed}'
+        )
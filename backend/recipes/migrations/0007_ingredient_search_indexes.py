@@ -0,0 +1,41 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEXES = (
+    (
+        'ingredient_name_prefix_idx',
+        'CREATE INDEX IF NOT EXISTS ingredient_name_prefix_idx '
+        'ON recipes_ingredient (UPPER(name::text) text_pattern_ops)',
+    ),
+    (
+        'ingredient_name_trgm_idx',
+        'CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx '
+        'ON recipes_ingredient USING gin (UPPER(name::text) gin_trgm_ops)',
+    ),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, sql in INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_auto_20230915_2030'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:20
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    groups = (
+        Ingredient.objects.order_by()
+        .values('name', 'measurement_unit')
+        .annotate(keep=Min('pk'), total=Count('pk'))
+        .filter(total__gt=1)
+    )
+    for group in groups:
+        duplicates = Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(pk=group['keep'])
+        rows = RecipeIngredient.objects.filter(ingredient__in=duplicates)
+        for row in rows:
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=row.recipe_id, ingredient_id=group['keep']
+            ).first()
+            if kept is None:
+                row.ingredient_id = group['keep']
+                row.save(update_fields=['ingredient'])
+            else:
+                kept.amount += row.amount
+                kept.save(update_fields=['amount'])
+                row.delete()
+        duplicates.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:23
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+FILL_VECTORS = '''
+UPDATE recipes_recipe AS recipe SET search_vector =
+    setweight(to_tsvector('russian', coalesce(recipe.name, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(recipe.text, '')), 'B')
+    || setweight(to_tsvector('russian', coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM recipes_recipeingredient AS link
+        JOIN recipes_ingredient AS ingredient
+            ON ingredient.id = link.ingredient_id
+        WHERE link.recipe_id = recipe.id
+    ), '')), 'C')
+'''
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(FILL_VECTORS)
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_ingredient_natural_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def through_model(name, db_table, verbose_name, verbose_name_plural):
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe')),
+            ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+        ],
+        options={
+            'verbose_name': verbose_name,
+            'verbose_name_plural': verbose_name_plural,
+            'db_table': db_table,
+            'abstract': False,
+            'unique_together': {('recipe', 'user')},
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0012_recipe_search_vector'),
+    ]
+
+    operations = [
+        # The tables already exist as auto-created many-to-many tables;
+        # only the migration state learns about the explicit models.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                through_model('Favorite', 'recipes_recipe_favorited', 'Избранное', 'Избранное'),
+                through_model('ShoppingCart', 'recipes_recipe_shopping_cart', 'Список покупок', 'Списки покупок'),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='favorited',
+                    field=models.ManyToManyField(blank=True, related_name='favorited', through='recipes.Favorite', to=settings.AUTH_USER_MODEL, verbose_name='Избранное'),
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='shopping_cart',
+                    field=models.ManyToManyField(blank=True, related_name='shopping_card', through='recipes.ShoppingCart', to=settings.AUTH_USER_MODEL, verbose_name='Список покупок'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+    ]
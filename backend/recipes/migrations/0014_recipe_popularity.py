@@ -0,0 +1,30 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_favorite_shopping_cart_through'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipePopularity',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='recipes.recipe')),
+                ('score', models.FloatField(verbose_name='Популярность')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Дата пересчёта')),
+            ],
+            options={
+                'verbose_name': 'Популярность рецепта',
+                'verbose_name_plural': 'Популярность рецептов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipepopularity',
+            index=models.Index(fields=['-score', '-recipe'], name='recipe_popularity_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+from recipes.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0014_recipe_popularity'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipeingredient',
+            options={'ordering': ['recipe', 'id'], 'verbose_name': 'Ингредиент в рецепте', 'verbose_name_plural': 'Ингредиенты в рецептах'},
+        ),
+        AddIndexConcurrently(
+            model_name='favorite',
+            index=models.Index(fields=['user', 'recipe'], name='favorite_user_recipe_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='favorite',
+            index=models.Index(fields=['created_at'], include=('recipe',), name='favorite_created_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='recipeingredient',
+            index=models.Index(fields=['recipe', 'ingredient'], include=('amount',), name='recipe_ingredient_amount_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='shoppingcart',
+            index=models.Index(fields=['user', 'recipe'], name='shoppingcart_user_recipe_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='shoppingcart',
+            index=models.Index(fields=['created_at'], include=('recipe',), name='shoppingcart_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Версия'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='payload',
+            field=models.JSONField(editable=False, null=True),
+        ),
+    ]
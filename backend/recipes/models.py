@@ -1,9 +1,29 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import connections, models
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    UniqueConstraint,
+    Value,
+    Window,
+)
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 from rest_framework import status
 
-from users.models import User
+from users.models import DerivedFieldsMixin, Follow, User
 
 
 class Tag(models.Model):
@@ -46,12 +66,142 @@ class Ingredient(models.Model):
         ordering = ['name']
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            UniqueConstraint(
+                name='unique_ingredient_unit',
+                fields=['name', 'measurement_unit'],
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+SEARCH_CONFIG = 'russian'
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return (
+            self.defer('search_vector', 'payload')
+            .select_related('author')
+            .prefetch_related(
+                'tags',
+                Prefetch(
+                    'recipeingredients',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient'
+                    ),
+                ),
+            )
+        )
+
+    def with_payload(self):
+        return self.select_related('author').only(
+            'id',
+            'name',
+            'text',
+            'cooking_time',
+            'image',
+            'version',
+            'payload',
+            'author__id',
+            'author__email',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+        )
+
+    def touch(self):
+        return self.update(
+            version=F('version') + 1, updated_at=timezone.now(), payload=None
+        )
+
+    def supports_search(self):
+        return connections[self.db].vendor == 'postgresql'
+
+    def search(self, value):
+        if not self.supports_search():
+            return self.filter(
+                Q(name__icontains=value) | Q(text__icontains=value)
+            )
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return (
+            self.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-pub_date', '-id')
+        )
+
+    def update_search_vectors(self):
+        if not self.supports_search():
+            return 0
+        ingredient_names = (
+            RecipeIngredient.objects.filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(names=StringAgg('ingredient__name', ' '))
+            .values('names')
+        )
+        return self.update(
+            search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG)
+                + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+                + SearchVector(
+                    Subquery(ingredient_names),
+                    weight='C',
+                    config=SEARCH_CONFIG,
+                )
+            )
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            false = Value(False, output_field=BooleanField())
+            return self.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false,
+                is_author_subscribed=false,
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Recipe.favorited.through.objects.filter(
+                    recipe=OuterRef('pk'), user=user
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                Recipe.shopping_cart.through.objects.filter(
+                    recipe=OuterRef('pk'), user=user
+                )
+            ),
+            is_author_subscribed=Exists(
+                Follow.objects.filter(following=OuterRef('author'), user=user)
+            ),
+        )
+
+    def previews_for_authors(self, authors, limit=None):
+        recipes = self.filter(author__in=authors).only(
+            'id', 'name', 'image', 'cooking_time', 'author_id'
+        )
+        if not limit:
+            return recipes
+        ranked = recipes.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=[F('author')],
+                order_by=[F('pub_date').desc(), F('id').desc()],
+            )
+        ).order_by()
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) AS ranked '
+            'WHERE row_number <= %s ORDER BY row_number',
+            (*params, limit),
+        )
+
+
+class Recipe(DerivedFieldsMixin, models.Model):
     name = models.CharField(verbose_name='Название рецепта', max_length=200)
     author = models.ForeignKey(
         User,
@@ -67,6 +217,10 @@ class Recipe(models.Model):
         ],
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+    version = models.PositiveIntegerField(
+        verbose_name='Версия', default=1, editable=False
+    )
     image = models.ImageField(upload_to='recipes/images')
     tags = models.ManyToManyField(
         Tag, related_name='recipes', verbose_name='Teги'
@@ -78,19 +232,51 @@ class Recipe(models.Model):
         through='RecipeIngredient',
     )
     favorited = models.ManyToManyField(
-        User, related_name='favorited', verbose_name='Избранное', blank=True
+        User,
+        related_name='favorited',
+        verbose_name='Избранное',
+        blank=True,
+        through='Favorite',
     )
     shopping_cart = models.ManyToManyField(
         User,
         related_name='shopping_card',
         verbose_name='Список покупок',
         blank=True,
+        through='ShoppingCart',
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлено в избранное', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Добавлено в списки покупок', default=0, editable=False
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+    payload = models.JSONField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    derived_fields = (
+        'favorites_count',
+        'in_carts_count',
+        'version',
+        'payload',
+        'search_vector',
     )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'Рецепт: {self.name}'
@@ -117,7 +303,7 @@ class RecipeIngredient(models.Model):
     )
 
     class Meta:
-        ordering = ['recipe']
+        ordering = ['recipe', 'id']
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
         constraints = [
@@ -125,6 +311,72 @@ class RecipeIngredient(models.Model):
                 name='unique_pair_of_recipes', fields=['recipe', 'ingredient']
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient'],
+                include=['amount'],
+                name='recipe_ingredient_amount_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'В {self.recipe} - {self.ingredient}, {self.amount}'
+
+
+class UserRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='+'
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField('Дата добавления', auto_now_add=True)
+
+    class Meta:
+        abstract = True
+        unique_together = ('recipe', 'user')
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'], name='%(class)s_user_recipe_idx'
+            ),
+            models.Index(
+                fields=['created_at'],
+                include=['recipe'],
+                name='%(class)s_created_at_idx',
+            ),
+        ]
+
+
+class Favorite(UserRecipe):
+    class Meta(UserRecipe.Meta):
+        db_table = 'recipes_recipe_favorited'
+        verbose_name = 'Избранное'
+        verbose_name_plural = 'Избранное'
+
+
+class ShoppingCart(UserRecipe):
+    class Meta(UserRecipe.Meta):
+        db_table = 'recipes_recipe_shopping_cart'
+        verbose_name = 'Список покупок'
+        verbose_name_plural = 'Списки покупок'
+
+
+class RecipePopularity(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity',
+    )
+    score = models.FloatField('Популярность')
+    refreshed_at = models.DateTimeField('Дата пересчёта')
+
+    class Meta:
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        indexes = [
+            models.Index(
+                fields=['-score', '-recipe'], name='recipe_popularity_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe}: {self.score:.2f}'
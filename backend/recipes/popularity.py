@@ -0,0 +1,73 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import Favorite, RecipePopularity, ShoppingCart
+
+
+def weights():
+    return (
+        (Favorite, settings.POPULARITY_FAVORITE_WEIGHT),
+        (ShoppingCart, settings.POPULARITY_CART_WEIGHT),
+    )
+
+
+def decay(age):
+    half_life = timedelta(hours=settings.POPULARITY_HALF_LIFE_HOURS)
+    return 0.5 ** (age / half_life)
+
+
+def horizon():
+    # Older events weigh less than POPULARITY_MIN_SCORE and are skipped.
+    heaviest = max(weight for _, weight in weights())
+    return timedelta(
+        hours=settings.POPULARITY_HALF_LIFE_HOURS
+        * math.log2(heaviest / settings.POPULARITY_MIN_SCORE)
+    )
+
+
+def event_scores(since, now):
+    scores = defaultdict(float)
+    for model, weight in weights():
+        events = model.objects.filter(
+            created_at__gt=since, created_at__lte=now
+        ).values_list('recipe_id', 'created_at')
+        for recipe_id, created_at in events.iterator(chunk_size=2000):
+            scores[recipe_id] += weight * decay(now - created_at)
+    return scores
+
+
+@transaction.atomic
+def refresh_popularity(full=False, now=None):
+    now = now or timezone.now()
+    last = None
+    if not full:
+        last = RecipePopularity.objects.aggregate(last=Max('refreshed_at'))[
+            'last'
+        ]
+    if last is None:
+        RecipePopularity.objects.all().delete()
+        scores = event_scores(now - horizon(), now)
+    else:
+        RecipePopularity.objects.update(
+            score=F('score') * decay(now - last), refreshed_at=now
+        )
+        scores = event_scores(last, now)
+    rows = RecipePopularity.objects.in_bulk(scores.keys())
+    for recipe_id, row in rows.items():
+        row.score += scores[recipe_id]
+    RecipePopularity.objects.bulk_update(rows.values(), ['score'])
+    RecipePopularity.objects.bulk_create(
+        RecipePopularity(recipe_id=recipe_id, score=score, refreshed_at=now)
+        for recipe_id, score in scores.items()
+        if recipe_id not in rows
+    )
+    removed, _ = RecipePopularity.objects.filter(
+        score__lt=settings.POPULARITY_MIN_SCORE
+    ).delete()
+    return len(scores), removed
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import authentication
+from users.models import User
+
+from .utils import ApiTestCase, make_recipe, make_user
+
+ME_URL = '/api/users/me/'
+
+
+@override_settings(AUTH_TOKEN_CACHE_ENABLED=True, AUTH_TOKEN_CACHE_ALIAS=None)
+class CachedTokenAuthenticationTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('author')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_snapshot_has_no_counters(self):
+        self.assertNotIn('recipes_count', authentication.SNAPSHOT_FIELDS)
+        self.assertNotIn('followers_count', authentication.SNAPSHOT_FIELDS)
+        self.assertNotIn('password', authentication.SNAPSHOT_FIELDS)
+
+    def test_set_password_keeps_counters(self):
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        make_recipe(self.user)
+        make_recipe(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/users/set_password/',
+                {
+                    'current_password': 'secret-pass-123',
+                    'new_password': 'other-pass-456',
+                },
+                format='json',
+            )
+        self.assertEqual(response.status_code, 204)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.recipes_count, 2)
+        self.assertTrue(user.check_password('other-pass-456'))
+
+    def test_deleted_token_is_rejected(self):
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    @override_settings(AUTH_TOKEN_LOCAL_TIMEOUT=5)
+    def test_local_entry_expires_without_shared_cache(self):
+        now = 1000.0
+        with mock.patch.object(
+            authentication.time, 'monotonic', side_effect=lambda: now
+        ):
+            self.assertEqual(self.client.get(ME_URL).status_code, 200)
+            # Revoked by another process: this one is never notified.
+            self.token.delete()
+            self.assertEqual(self.client.get(ME_URL).status_code, 200)
+            now += 6
+            self.assertEqual(self.client.get(ME_URL).status_code, 401)
@@ -0,0 +1,94 @@
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from api.instrumentation import BudgetExceeded, assert_budget
+from recipes.models import Favorite, RecipePopularity, ShoppingCart
+from users.models import Follow
+
+from .utils import (
+    ApiTestCase,
+    auth_client,
+    make_ingredients,
+    make_recipe,
+    make_tags,
+    make_user,
+)
+
+
+class RequestBudgetTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        tags = make_tags(3)
+        self.ingredients = make_ingredients(4)
+        self.reader = make_user('reader')
+        self.recipes = []
+        for number in range(3):
+            author = make_user(f'author{number}')
+            Follow.objects.create(user=self.reader, following=author)
+            for index in range(3):
+                recipe = make_recipe(
+                    author, tags, self.ingredients, name=f'recipe{index}'
+                )
+                Favorite.objects.create(user=self.reader, recipe=recipe)
+                ShoppingCart.objects.create(user=self.reader, recipe=recipe)
+                RecipePopularity.objects.create(
+                    recipe=recipe, score=index + 1, refreshed_at=timezone.now()
+                )
+                self.recipes.append(recipe)
+        self.client = auth_client(self.reader)
+
+    def get(self, view, url, **params):
+        with assert_budget(view) as stats:
+            response = self.client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return stats
+
+    def test_recipes(self):
+        self.get('recipe-list', '/api/recipes/', limit=6)
+        self.get('recipe-list', '/api/recipes/', is_favorited=1)
+        self.get('recipe-detail', f'/api/recipes/{self.recipes[0].pk}/')
+        self.get('recipe-popular', '/api/recipes/popular/')
+        self.get(
+            'recipe-cookable',
+            '/api/recipes/cookable/',
+            ingredients=f'{self.ingredients[0].pk},{self.ingredients[1].pk}',
+        )
+        self.get(
+            'recipe-download-shopping-cart',
+            '/api/recipes/download_shopping_cart/',
+        )
+
+    def test_users(self):
+        self.get('user-list', '/api/users/')
+        self.get('user-detail', f'/api/users/{self.reader.pk}/')
+        self.get('user-me', '/api/users/me/')
+        self.get('user-subscriptions', '/api/users/subscriptions/')
+        self.get(
+            'user-subscriptions',
+            '/api/users/subscriptions/',
+            recipes_limit=1,
+        )
+
+    def test_catalogs(self):
+        self.get('tag-list', '/api/tags/')
+        self.get('ingredient-list', '/api/ingredients/')
+        self.get('ingredient-list', '/api/ingredients/', name='ingr')
+
+    def test_serializer_time_is_recorded(self):
+        stats = self.get('recipe-list', '/api/recipes/')
+        self.assertGreater(stats.serializer_seconds, 0)
+
+
+class AssertBudgetTest(SimpleTestCase):
+    @override_settings(REQUEST_BUDGETS={'view': {'queries': 0}})
+    def test_raises_over_budget(self):
+        with self.assertRaisesMessage(BudgetExceeded, 'view'):
+            with assert_budget('view') as stats:
+                stats.queries['SELECT 1'] += 1
+
+    @override_settings(REQUEST_BUDGETS={})
+    def test_unknown_view_has_no_budget(self):
+        with assert_budget('view') as stats:
+            stats.queries['SELECT 1'] += 1
@@ -0,0 +1,126 @@
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.test import override_settings
+
+from api.checks import check_shared_cache
+from api.cookable import record_change
+from recipes.models import RecipeIngredient, Tag
+
+from .utils import (
+    ApiTestCase,
+    make_ingredients,
+    make_recipe,
+    make_tags,
+    make_user,
+)
+
+TAGS_URL = '/api/tags/'
+COOKABLE_URL = '/api/recipes/cookable/'
+
+cache_dir = tempfile.TemporaryDirectory()
+shared_cache = override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cache_dir.name,
+        }
+    }
+)
+
+
+class LocalCacheTest(ApiTestCase):
+    def test_responses_are_cached_briefly(self):
+        tag, = make_tags(1)
+        etag = self.client.get(TAGS_URL)['ETag']
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # update() sends no signals, like an edit made by another worker.
+        Tag.objects.update(name='renamed')
+        self.assertEqual(self.client.get(TAGS_URL).json()[0]['name'], 'tag0')
+        expired = time.time() + settings.RESPONSE_CACHE_LOCAL_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time') as now:
+            now.return_value = expired
+            response = self.client.get(TAGS_URL)
+        self.assertEqual(response.json()[0]['name'], 'renamed')
+
+    def test_ingredient_search_is_cached(self):
+        make_ingredients(2)
+        url = '/api/ingredients/?name=ingr'
+        self.assertEqual(len(self.client.get(url).json()), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get(url).json()), 2)
+
+    @override_settings(RECIPE_CACHE_ENABLED=True)
+    def test_recipe_cache_is_off(self):
+        make_recipe(make_user('author'))
+        with mock.patch('api.views.render_recipes') as render_recipes:
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        render_recipes.assert_not_called()
+
+    @override_settings(INGREDIENT_SEARCH_IN_MEMORY=True)
+    def test_ingredient_search_reads_database(self):
+        make_ingredients(2)
+        with mock.patch('api.views.ingredient_lookup') as lookup:
+            response = self.client.get('/api/ingredients/?name=ingr')
+        self.assertEqual(len(response.json()), 2)
+        lookup.search.assert_not_called()
+
+    def test_cookable_index_is_kept_briefly(self):
+        first, second = make_ingredients(2)
+        recipe = make_recipe(make_user('author'), ingredients=[first])
+        url = f'{COOKABLE_URL}?ingredients={first.pk}'
+        self.assertEqual(self.client.get(url).data[0]['missing'], 0)
+        # bulk_create sends no signals, like an edit made by another worker.
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(recipe=recipe, ingredient=second, amount=1)]
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).data[0]['missing'], 0)
+        expired = time.monotonic() + settings.COOKABLE_LOCAL_TIMEOUT
+        with mock.patch('api.cookable.time.monotonic', return_value=expired):
+            self.assertEqual(self.client.get(url).data[0]['missing'], 1)
+
+    def test_cookable_sees_own_changes(self):
+        first, second = make_ingredients(2)
+        recipe = make_recipe(make_user('author'), ingredients=[first])
+        url = f'{COOKABLE_URL}?ingredients={first.pk}'
+        self.assertEqual(self.client.get(url).data[0]['missing'], 0)
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(recipe=recipe, ingredient=second, amount=1)]
+        )
+        record_change(recipe.pk)
+        self.assertEqual(self.client.get(url).data[0]['missing'], 1)
+
+    @override_settings(
+        RECIPE_CACHE_ENABLED=True, INGREDIENT_SEARCH_IN_MEMORY=True
+    )
+    def test_check_warns(self):
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)],
+            ['api.W001', 'api.W001'],
+        )
+
+
+@shared_cache
+class SharedCacheTest(ApiTestCase):
+    def test_responses_are_cached(self):
+        tag, = make_tags(1)
+        etag = self.client.get(TAGS_URL)['ETag']
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        tag.name = 'renamed'
+        tag.save()
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['name'], 'renamed')
+
+    @override_settings(
+        RECIPE_CACHE_ENABLED=True, INGREDIENT_SEARCH_IN_MEMORY=True
+    )
+    def test_check_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
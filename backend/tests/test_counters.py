@@ -0,0 +1,188 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+from .utils import ApiTestCase, auth_client, make_recipe, make_user
+
+
+class DerivedFieldsSaveTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.recipe = make_recipe(self.author)
+
+    def test_user_save_keeps_counters(self):
+        user = User.objects.get(pk=self.author.pk)
+        User.objects.filter(pk=user.pk).update(
+            recipes_count=F('recipes_count') + 5,
+            followers_count=F('followers_count') + 2,
+        )
+        user.set_password('another-pass-456')
+        user.save()
+        user.refresh_from_db()
+        self.assertEqual(user.recipes_count, 6)
+        self.assertEqual(user.followers_count, 2)
+        self.assertTrue(user.check_password('another-pass-456'))
+
+    def test_recipe_save_keeps_counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            favorites_count=F('favorites_count') + 3,
+            in_carts_count=F('in_carts_count') + 1,
+        )
+        recipe.name = 'renamed'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'renamed')
+        self.assertEqual(recipe.favorites_count, 3)
+        self.assertEqual(recipe.in_carts_count, 1)
+
+    def test_set_password_endpoint_keeps_counters(self):
+        client = auth_client(self.author)
+        User.objects.filter(pk=self.author.pk).update(followers_count=4)
+        response = client.post(
+            '/api/users/set_password/',
+            {
+                'current_password': 'secret-pass-123',
+                'new_password': 'another-pass-456',
+            },
+        )
+        self.assertEqual(response.status_code, 204)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+        self.assertEqual(self.author.followers_count, 4)
+
+
+class RelationCountersTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.recipes = [
+            make_recipe(self.author, name=f'recipe{i}') for i in range(3)
+        ]
+        self.reader = make_user('reader')
+        self.client = auth_client(self.reader)
+
+    def counters(self):
+        return (
+            list(
+                Recipe.objects.order_by('pk').values_list(
+                    'favorites_count', 'in_carts_count'
+                )
+            ),
+            User.objects.get(pk=self.author.pk).followers_count,
+        )
+
+    def test_single_add_and_remove(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.pk}/favorite/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.counters()[0][0], (1, 0))
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(self.counters()[0][0], (0, 0))
+
+    def test_bulk_counts_only_changed_rows(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        Favorite.objects.create(user=self.reader, recipe=self.recipes[0])
+        response = self.client.post(
+            '/api/recipes/favorite/',
+            {'ids': [first, second, second, 999]},
+            format='json',
+        )
+        self.assertEqual(
+            response.data['results'],
+            [
+                {'id': first, 'status': 'exists'},
+                {'id': second, 'status': 'created'},
+                {'id': 999, 'status': 'not_found'},
+            ],
+        )
+        self.assertEqual(self.counters()[0], [(1, 0), (1, 0), (0, 0)])
+        response = self.client.delete(
+            '/api/recipes/favorite/',
+            {'ids': [second, third]},
+            format='json',
+        )
+        self.assertEqual(
+            response.data['results'],
+            [
+                {'id': second, 'status': 'deleted'},
+                {'id': third, 'status': 'not_found'},
+            ],
+        )
+        self.assertEqual(self.counters()[0], [(1, 0), (0, 0), (0, 0)])
+
+    def test_bulk_subscribe(self):
+        response = self.client.post(
+            '/api/users/subscribe/',
+            {'ids': [self.author.pk, self.reader.pk]},
+            format='json',
+        )
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['created', 'invalid'],
+        )
+        self.assertEqual(self.counters()[1], 1)
+
+    def test_model_writes_update_counters(self):
+        follow = Follow.objects.create(user=self.reader, following=self.author)
+        cart = ShoppingCart.objects.create(
+            user=self.reader, recipe=self.recipes[1]
+        )
+        self.assertEqual(self.counters(), ([(0, 0), (0, 1), (0, 0)], 1))
+        follow.delete()
+        cart.delete()
+        self.assertEqual(self.counters(), ([(0, 0), (0, 0), (0, 0)], 0))
+
+    def test_cascades_update_counters(self):
+        for recipe in self.recipes:
+            self.client.post(f'/api/recipes/{recipe.pk}/favorite/')
+            self.client.post(f'/api/recipes/{recipe.pk}/shopping_cart/')
+        self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(self.counters(), ([(1, 1)] * 3, 1))
+        self.recipes[0].delete()
+        self.assertEqual(self.counters(), ([(1, 1)] * 2, 1))
+        self.reader.delete()
+        self.assertEqual(self.counters(), ([(0, 0)] * 2, 0))
+
+    def test_drifted_counters_stay_at_zero(self):
+        recipe = self.recipes[0]
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=recipe)
+        Follow.objects.create(user=self.reader, following=self.author)
+        Recipe.objects.update(favorites_count=0, in_carts_count=0)
+        User.objects.update(recipes_count=0, followers_count=0)
+        self.assertEqual(
+            self.client.delete(
+                f'/api/recipes/{recipe.pk}/favorite/'
+            ).status_code,
+            204,
+        )
+        response = self.client.delete(
+            '/api/recipes/shopping_cart/', {'ids': [recipe.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.delete(
+                f'/api/users/{self.author.pk}/subscribe/'
+            ).status_code,
+            204,
+        )
+        recipe.delete()
+        self.assertEqual(self.counters(), ([(0, 0)] * 2, 0))
+        self.assertEqual(User.objects.get(pk=self.author.pk).recipes_count, 0)
+
+    def test_recount_fixes_drift(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipes[0])
+        Follow.objects.create(user=self.reader, following=self.author)
+        Recipe.objects.update(favorites_count=5, in_carts_count=2)
+        User.objects.update(recipes_count=0, followers_count=7)
+        call_command('recount_counters', stdout=StringIO())
+        self.assertEqual(self.counters(), ([(1, 0), (0, 0), (0, 0)], 1))
+        self.assertEqual(User.objects.get(pk=self.author.pk).recipes_count, 3)
@@ -0,0 +1,34 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from recipes.models import Ingredient
+
+from .utils import ApiTestCase
+
+
+class CsvImportTest(ApiTestCase):
+    def load(self, content):
+        file = tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='UTF-8'
+        )
+        self.addCleanup(file.close)
+        file.write(content)
+        file.flush()
+        stdout = StringIO()
+        call_command('csv_import_script', path=file.name, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_skips_blank_rows(self):
+        output = self.load('соль,г\n\n ,\nсахар,г\nсоль,г\n')
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', flat=True)),
+            {'соль', 'сахар'},
+        )
+        self.assertIn('добавлено: 2', output)
+
+    def test_short_row_reports_line(self):
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            self.load('соль,г\nсахар\n')
+        self.assertFalse(Ingredient.objects.exists())
@@ -0,0 +1,32 @@
+import os
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.models import Recipe
+
+
+def explain(**options):
+    stdout = StringIO()
+    call_command('explain_queries', stdout=stdout, **options)
+    return stdout.getvalue()
+
+
+class ExplainQueriesTest(TestCase):
+    # Plans depend on the database and on the data size: run against the
+    # production backend with EXPLAIN_QUERIES_TESTS=True.
+    @skipUnless(
+        os.getenv('EXPLAIN_QUERIES_TESTS', 'False') == 'True',
+        'EXPLAIN_QUERIES_TESTS не включён',
+    )
+    def test_queries_use_indexes(self):
+        output = explain(users=200, recipes=10000)
+        self.assertNotIn('FAIL', output)
+        self.assertIn('cart_summary', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_unknown_query(self):
+        with self.assertRaisesMessage(CommandError, 'missing'):
+            explain(users=2, recipes=1, only=['missing'])
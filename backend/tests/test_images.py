@@ -0,0 +1,147 @@
+import base64
+import tempfile
+import threading
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.serializers import Base64ImageField
+from recipes import images
+
+from .utils import (
+    ApiTestCase,
+    auth_client,
+    make_ingredients,
+    make_tags,
+    make_user,
+)
+
+
+def data_url(content, format='png'):
+    return f'data:image/{format};base64,' + base64.b64encode(content).decode()
+
+
+def png(width=2, height=2):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    def decode(self, data):
+        return Base64ImageField().to_internal_value(data)
+
+    def assertRejected(self, data, message):
+        with self.assertRaises(ValidationError) as context:
+            self.decode(data)
+        self.assertEqual(context.exception.detail, [message])
+
+    def test_valid_image(self):
+        image = self.decode(data_url(png()))
+        self.assertEqual(image.image.size, (2, 2))
+
+    def test_not_an_image(self):
+        self.assertRejected(
+            data_url(b'plain text'), 'Некорректное изображение'
+        )
+
+    def test_truncated_image(self):
+        self.assertRejected(
+            data_url(png()[:20]), 'Некорректное изображение'
+        )
+
+    def test_missing_payload(self):
+        self.assertRejected('data:image/png', 'Некорректное изображение')
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=10)
+    def test_too_many_pixels(self):
+        self.assertRejected(
+            data_url(png(4, 4)), 'Слишком большое разрешение изображения'
+        )
+
+    def test_decompression_bomb(self):
+        with mock.patch(
+            'api.serializers.Image.open',
+            side_effect=Image.DecompressionBombError,
+        ):
+            self.assertRejected(
+                data_url(png()), 'Слишком большое разрешение изображения'
+            )
+
+
+class RecipeImageTest(ApiTestCase):
+    def test_invalid_image_is_bad_request(self):
+        client = auth_client(make_user('author'))
+        response = client.post(
+            '/api/recipes/',
+            {
+                'tags': [tag.pk for tag in make_tags(1)],
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 1}
+                    for ingredient in make_ingredients(1)
+                ],
+                'image': data_url(b'plain text'),
+                'name': 'recipe',
+                'text': 'Описание',
+                'cooking_time': 5,
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['image'], ['Некорректное изображение'])
+
+
+class ScheduleVariantsTest(SimpleTestCase):
+    def test_full_queue_does_not_block(self):
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch.object(images, '_slots', slots), mock.patch.object(
+            images, 'get_executor'
+        ) as get_executor, self.assertLogs(images.logger, 'WARNING'):
+            images.schedule_variants('recipes/images/test.png')
+        get_executor.assert_not_called()
+
+    def test_free_slot_submits(self):
+        slots = threading.BoundedSemaphore(1)
+        with mock.patch.object(images, '_slots', slots), mock.patch.object(
+            images, 'get_executor'
+        ) as get_executor:
+            images.schedule_variants('recipes/images/test.png')
+        get_executor.return_value.submit.assert_called_once_with(
+            images._run, 'recipes/images/test.png'
+        )
+
+
+class MakeVariantsTest(SimpleTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(
+            MEDIA_ROOT=media.name, RECIPE_IMAGE_WIDTHS=[2]
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def save(self, name, size, format):
+        buffer = BytesIO()
+        Image.new('RGB', size).save(buffer, format)
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def test_same_stem_keeps_separate_variants(self):
+        png_name = self.save('recipes/images/temp.png', (2, 1), 'PNG')
+        jpeg_name = self.save('recipes/images/temp.jpeg', (2, 2), 'JPEG')
+        images.make_variants(png_name)
+        images.make_variants(jpeg_name)
+        sizes = {}
+        for name in (png_name, jpeg_name):
+            target = images.variant_name(name, 2)
+            with default_storage.open(target) as file, Image.open(
+                file
+            ) as image:
+                sizes[name] = image.size
+        self.assertEqual(sizes, {png_name: (2, 1), jpeg_name: (2, 2)})
@@ -0,0 +1,40 @@
+from django.test import override_settings
+
+from .utils import ApiTestCase, make_user
+
+URL = '/api/metrics/'
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='scrape-token')
+class MetricsViewTest(ApiTestCase):
+    def test_anonymous_is_forbidden(self):
+        self.assertEqual(self.client.get(URL).status_code, 403)
+
+    def test_wrong_token_is_forbidden(self):
+        response = self.client.get(URL, HTTP_AUTHORIZATION='Bearer other')
+        self.assertEqual(response.status_code, 403)
+
+    def test_token(self):
+        response = self.client.get(
+            URL, HTTP_AUTHORIZATION='Bearer scrape-token'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE api_requests_total counter', response.content)
+
+    def test_staff_session(self):
+        self.client.force_login(make_user('admin', is_staff=True))
+        self.assertEqual(self.client.get(URL).status_code, 200)
+
+    def test_regular_user_is_forbidden(self):
+        self.client.force_login(make_user('reader'))
+        self.assertEqual(self.client.get(URL).status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_empty_token_never_matches(self):
+        response = self.client.get(URL, HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.force_login(make_user('admin', is_staff=True))
+        self.assertEqual(self.client.get(URL).status_code, 404)
@@ -0,0 +1,101 @@
+import base64
+import json
+
+from .utils import ApiTestCase, auth_client, make_recipe, make_user
+
+RECIPES_URL = '/api/recipes/'
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class CursorPaginationTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        author = make_user('author')
+        self.recipes = [
+            make_recipe(author, name=f'recipe{i}') for i in range(5)
+        ]
+
+    def test_walks_all_pages(self):
+        url = f'{RECIPES_URL}?limit=2&cursor='
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            names.extend(recipe['name'] for recipe in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(names, [f'recipe{i}' for i in reversed(range(5))])
+
+    def test_tampered_cursor_is_not_found(self):
+        pub_date = self.recipes[0].pub_date.isoformat()
+        for value in (
+            '%%%',
+            base64.urlsafe_b64encode(b'not json').decode(),
+            base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+            cursor({'pub_date': pub_date}),
+            cursor([pub_date]),
+            cursor([None, None]),
+            cursor([pub_date, None]),
+            cursor([pub_date, True]),
+            cursor([pub_date, [1]]),
+            cursor([{'a': 1}, 1]),
+            cursor(['garbage', 1]),
+            cursor([pub_date, 'abc']),
+            cursor(['2023-01-01T00:00:00', 1]),
+        ):
+            with self.subTest(cursor=value):
+                response = self.client.get(RECIPES_URL, {'cursor': value})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data['detail'], 'Неверный курсор')
+
+    def test_users_cursor(self):
+        response = self.client.get('/api/users/', {'cursor': cursor([1, 1])})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            '/api/users/', {'cursor': cursor(['author', 'x'])}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class CachedCountTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        author = make_user('author')
+        self.recipes = [
+            make_recipe(author, name=f'recipe{i}') for i in range(7)
+        ]
+        self.client = auth_client(make_user('reader'))
+
+    def favorites(self, page):
+        return self.client.get(
+            RECIPES_URL, {'is_favorited': 1, 'limit': 6, 'page': page}
+        )
+
+    def test_user_filter_count_follows_own_writes(self):
+        for recipe in self.recipes[:6]:
+            self.client.post(f'{RECIPES_URL}{recipe.pk}/favorite/')
+        response = self.favorites(1)
+        self.assertEqual(response.data['count'], 6)
+        self.assertIsNone(response.data['next'])
+        self.client.post(f'{RECIPES_URL}{self.recipes[6].pk}/favorite/')
+        response = self.favorites(1)
+        self.assertEqual(response.data['count'], 7)
+        self.assertIsNotNone(response.data['next'])
+        response = self.favorites(2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_subscriptions_count_follows_own_writes(self):
+        authors = [make_user(f'other{i}') for i in range(2)]
+        url = '/api/users/subscriptions/'
+        self.client.post(f'/api/users/{authors[0].pk}/subscribe/')
+        self.assertEqual(self.client.get(url).data['count'], 1)
+        self.client.post(f'/api/users/{authors[1].pk}/subscribe/')
+        self.assertEqual(self.client.get(url).data['count'], 2)
+
+    def test_shared_count_is_cached(self):
+        self.assertEqual(self.client.get(RECIPES_URL).data['count'], 7)
+        make_recipe(make_user('other'))
+        self.assertEqual(self.client.get(RECIPES_URL).data['count'], 7)
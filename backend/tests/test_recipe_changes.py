@@ -0,0 +1,136 @@
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe, RecipeQuerySet
+
+from .utils import (
+    ApiTransactionTestCase,
+    auth_client,
+    make_ingredients,
+    make_recipe,
+    make_tags,
+    make_user,
+)
+
+
+class RecipeChangesTest(ApiTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.tags = make_tags(3)
+        self.ingredients = make_ingredients(6)
+        self.recipe = make_recipe(
+            self.author, self.tags[:2], self.ingredients[:4]
+        )
+        self.client = auth_client(self.author)
+        self.indexed = []
+        patcher = mock.patch.object(
+            RecipeQuerySet,
+            'update_search_vectors',
+            autospec=True,
+            side_effect=lambda queryset: self.indexed.append(
+                set(queryset.values_list('pk', flat=True))
+            ),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def patch(self):
+        return self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {
+                'tags': [self.tags[2].pk],
+                'ingredients': [
+                    {'id': self.ingredients[0].pk, 'amount': 7},
+                    {'id': self.ingredients[5].pk, 'amount': 1},
+                ],
+            },
+            format='json',
+        )
+
+    def version(self):
+        return Recipe.objects.get(pk=self.recipe.pk).version
+
+    def test_patch_indexes_recipe_once(self):
+        with mock.patch('api.signals.record_change') as record_change:
+            self.assertEqual(self.patch().status_code, 200)
+        self.assertEqual(self.indexed, [{self.recipe.pk}])
+        record_change.assert_called_once_with(self.recipe.pk)
+
+    def test_patch_touches_recipe_once(self):
+        version = self.version()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.patch().status_code, 200)
+        touches = [
+            query
+            for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "recipes_recipe" SET "version"')
+        ]
+        self.assertEqual(len(touches), 1)
+        self.assertEqual(self.version(), version + 1)
+
+    def test_patch_bumps_cache_version_once(self):
+        with mock.patch('api.signals.bump_version') as bump_version:
+            self.patch()
+        bump_version.assert_called_once_with(f'recipe:{self.recipe.pk}')
+
+    def test_touch_undone_by_savepoint_is_repeated(self):
+        other = make_recipe(self.author)
+        version = self.version()
+        with transaction.atomic():
+            other.save()
+            try:
+                with transaction.atomic():
+                    Recipe.objects.get(pk=self.recipe.pk).save()
+                    raise ValueError
+            except ValueError:
+                pass
+            self.assertEqual(self.version(), version)
+            Recipe.objects.get(pk=self.recipe.pk).save()
+            Recipe.objects.get(pk=self.recipe.pk).save()
+        self.assertEqual(self.version(), version + 1)
+
+    def test_ingredient_delete_indexes_each_recipe_once(self):
+        other = make_recipe(self.author, ingredients=self.ingredients[:2])
+        self.indexed.clear()
+        with transaction.atomic():
+            self.ingredients[0].delete()
+            self.ingredients[1].delete()
+        self.assertEqual(self.indexed, [{self.recipe.pk, other.pk}])
+
+    def test_rolled_back_savepoint_keeps_later_changes(self):
+        self.indexed.clear()
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    self.recipe.save()
+                    raise ValueError
+            except ValueError:
+                pass
+            Recipe.objects.get(pk=self.recipe.pk).save()
+        self.assertEqual(self.indexed, [{self.recipe.pk}])
+
+    def test_rolled_back_transaction_does_not_leak_batch(self):
+        self.indexed.clear()
+        try:
+            with transaction.atomic():
+                self.recipe.save()
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(self.indexed, [])
+        with transaction.atomic():
+            Recipe.objects.get(pk=self.recipe.pk).save()
+        self.assertEqual(self.indexed, [{self.recipe.pk}])
+
+    def test_each_transaction_gets_its_own_batch(self):
+        other = make_recipe(self.author)
+        self.indexed.clear()
+        with transaction.atomic():
+            self.recipe.save()
+        with transaction.atomic():
+            other.save()
+        self.assertEqual(self.indexed, [{self.recipe.pk}, {other.pk}])
+        self.assertIsNone(getattr(connection, 'recipe_changes', None))
@@ -0,0 +1,69 @@
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.views import favorites, follows, shopping_carts
+
+from .utils import (
+    ApiTestCase,
+    auth_client,
+    make_ingredients,
+    make_recipe,
+    make_tags,
+    make_user,
+)
+
+
+class RecipeListQueriesTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('reader')
+        tags = make_tags(3)
+        ingredients = make_ingredients(5)
+        for i in range(3):
+            author = make_user(f'author{i}')
+            for j in range(4):
+                recipe = make_recipe(
+                    author, tags[: j % 3 + 1], ingredients, f'recipe{i}{j}'
+                )
+                if j % 2:
+                    favorites.add(self.user, recipe.pk)
+                    shopping_carts.add(self.user, recipe.pk)
+            follows.add(self.user, author.pk)
+
+    def test_anonymous_list(self):
+        with self.assertNumQueries(4):
+            response = APIClient().get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_authenticated_list(self):
+        client = auth_client(self.user)
+        with self.assertNumQueries(5):
+            response = client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertTrue(any(recipe['is_favorited'] for recipe in results))
+        self.assertTrue(
+            all(recipe['author']['is_subscribed'] for recipe in results)
+        )
+
+    def test_queries_do_not_grow_with_page_size(self):
+        client = auth_client(self.user)
+        with self.assertNumQueries(5):
+            response = client.get('/api/recipes/', {'limit': 12})
+        self.assertEqual(len(response.data['results']), 12)
+
+    @override_settings(FAST_SERIALIZERS=True)
+    def test_fast_serializers_list(self):
+        client = auth_client(self.user)
+        with self.assertNumQueries(5):
+            response = client.get('/api/recipes/')
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_detail(self):
+        recipe_id = APIClient().get('/api/recipes/').data['results'][0]['id']
+        client = auth_client(self.user)
+        with self.assertNumQueries(4):
+            response = client.get(f'/api/recipes/{recipe_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['ingredients']), 5)
@@ -0,0 +1,70 @@
+import datetime
+import decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+
+from .utils import ApiTestCase, auth_client, make_ingredients, make_user
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def test_matches_json_renderer(self):
+        for data in (
+            {'ids': {0: ['Введите целое число.'], 3: ['Ошибка']}},
+            [{'a': 1, 'b': [None, True, 1.5]}],
+            {'text': 'строка\u2028\u2029'},
+            {'lazy': gettext_lazy('Not found.')},
+            {'amount': decimal.Decimal('1.50')},
+            {'date': datetime.date(2023, 1, 2)},
+            {},
+            [],
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(
+                    FastJSONRenderer().render(data),
+                    JSONRenderer().render(data),
+                )
+
+
+class ErrorPayloadTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = auth_client(make_user('reader'))
+
+    def post(self, url, data):
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.content, JSONRenderer().render(response.data)
+        )
+        return response.json()
+
+    def test_bulk_favorite_with_bad_id(self):
+        self.assertEqual(
+            self.post('/api/recipes/favorite/', {'ids': [1, 'x']}),
+            {'ids': {'1': ['Введите правильное число.']}},
+        )
+
+    def test_bulk_subscribe_with_bad_id(self):
+        self.assertIn(
+            '0', self.post('/api/users/subscribe/', {'ids': [0]})['ids']
+        )
+
+    def test_recipe_with_bad_tag(self):
+        errors = self.post(
+            '/api/recipes/',
+            {
+                'tags': ['x'],
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 1}
+                    for ingredient in make_ingredients(1)
+                ],
+                'name': 'recipe',
+                'text': 'Описание',
+                'cooking_time': 5,
+            },
+        )
+        self.assertIn('0', errors['tags'])
@@ -0,0 +1,74 @@
+from recipes.models import ShoppingCart
+
+from .utils import (
+    ApiTestCase,
+    auth_client,
+    make_ingredients,
+    make_recipe,
+    make_user,
+)
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingCartDownloadTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ingredients = make_ingredients(2)
+        author = make_user('author')
+        self.recipe = make_recipe(author, ingredients=self.ingredients)
+        self.other = make_recipe(author, ingredients=self.ingredients[:1])
+        self.reader = make_user('reader')
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        self.client = auth_client(self.reader)
+
+    def etag(self):
+        response = self.client.get(URL, HTTP_ACCEPT='text/plain')
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified(self):
+        response = self.client.get(
+            URL, HTTP_ACCEPT='text/plain', HTTP_IF_NONE_MATCH=self.etag()
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_format(self):
+        response = self.client.get(URL, HTTP_ACCEPT='text/csv')
+        self.assertNotEqual(response['ETag'], self.etag())
+
+    def test_ingredient_rename_changes_etag(self):
+        etag = self.etag()
+        ingredient = self.ingredients[0]
+        ingredient.name = 'renamed'
+        ingredient.save()
+        self.assertNotEqual(self.etag(), etag)
+        response = self.client.get(URL, HTTP_ACCEPT='text/plain')
+        self.assertIn(
+            'renamed', b''.join(response.streaming_content).decode()
+        )
+
+    def test_measurement_unit_change_changes_etag(self):
+        etag = self.etag()
+        ingredient = self.ingredients[1]
+        ingredient.measurement_unit = 'кг'
+        ingredient.save()
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_cart_membership_changes_etag(self):
+        etag = self.etag()
+        ShoppingCart.objects.create(user=self.reader, recipe=self.other)
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_unrelated_recipe_keeps_etag(self):
+        etag = self.etag()
+        self.other.name = 'other'
+        self.other.save()
+        self.assertEqual(self.etag(), etag)
+
+    def test_not_modified_queries(self):
+        etag = self.etag()
+        with self.assertNumQueries(2):
+            self.client.get(
+                URL, HTTP_ACCEPT='text/plain', HTTP_IF_NONE_MATCH=etag
+            )
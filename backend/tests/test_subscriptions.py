@@ -0,0 +1,56 @@
+from django.test.utils import override_settings
+
+from api.views import follows
+
+from .utils import ApiTestCase, auth_client, make_recipe, make_user
+
+
+class SubscriptionsTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('reader')
+        self.client = auth_client(self.user)
+        for i in range(2):
+            author = make_user(f'author{i}')
+            for j in range(3):
+                make_recipe(author, name=f'recipe{i}{j}')
+            follows.add(self.user, author.pk)
+
+    def get_recipes(self, **params):
+        response = self.client.get('/api/users/subscriptions/', params)
+        self.assertEqual(response.status_code, 200)
+        return [len(author['recipes']) for author in response.data['results']]
+
+    def test_recipes_limit(self):
+        self.assertEqual(self.get_recipes(recipes_limit=2), [2, 2])
+
+    def test_missing_or_non_positive_limit_returns_all(self):
+        self.assertEqual(self.get_recipes(), [3, 3])
+        self.assertEqual(self.get_recipes(recipes_limit=0), [3, 3])
+        self.assertEqual(self.get_recipes(recipes_limit=-1), [3, 3])
+
+    def test_invalid_limit(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 'abc'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recipes_limit', response.data)
+
+    @override_settings(FAST_SERIALIZERS=True)
+    def test_fast_serializers(self):
+        self.assertEqual(self.get_recipes(recipes_limit=-1), [3, 3])
+        self.assertEqual(self.get_recipes(recipes_limit=1), [1, 1])
+
+    def test_subscribe_response_limit(self):
+        author = make_user('author2')
+        for j in range(3):
+            make_recipe(author, name=f'extra{j}')
+        response = self.client.post(
+            f'/api/users/{author.pk}/subscribe/?recipes_limit=-1'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['recipes']), 3)
+
+    def test_queries(self):
+        with self.assertNumQueries(4):
+            self.get_recipes(recipes_limit=2)
@@ -0,0 +1,75 @@
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import local_tokens
+from api.cache import local_cache
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+def make_user(name, **kwargs):
+    return User.objects.create_user(
+        email=f'{name}@example.com',
+        username=name,
+        first_name='Имя',
+        last_name='Фамилия',
+        password='secret-pass-123',
+        **kwargs,
+    )
+
+
+def make_tags(count):
+    return [
+        Tag.objects.create(name=f'tag{i}', color='#AABBCC', slug=f'tag{i}')
+        for i in range(count)
+    ]
+
+
+def make_ingredients(count):
+    return [
+        Ingredient.objects.create(name=f'ingredient{i}', measurement_unit='г')
+        for i in range(count)
+    ]
+
+
+def make_recipe(author, tags=(), ingredients=(), name='recipe'):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text='Описание',
+        cooking_time=10,
+        image='recipes/images/test.png',
+    )
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=i + 1)
+        for i, ingredient in enumerate(ingredients)
+    )
+    return recipe
+
+
+def auth_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+    )
+    return client
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    local_cache.clear()
+    local_tokens.clear()
+
+
+class ApiTestCase(TestCase):
+    def setUp(self):
+        clear_caches()
+
+
+class ApiTransactionTestCase(TransactionTestCase):
+    def setUp(self):
+        clear_caches()
@@ -3,7 +3,13 @@ from django.contrib.auth.admin import UserAdmin
 
 from .models import Follow, User
 
-admin.site.register(User, UserAdmin)
+
+@admin.register(User)
+class CustomUserAdmin(UserAdmin):
+    list_display = UserAdmin.list_display + (
+        'recipes_count',
+        'followers_count',
+    )
 
 
 @admin.register(Follow)
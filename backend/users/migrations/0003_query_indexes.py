@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+from recipes.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='follow',
+            index=models.Index(fields=['following', 'user'], name='follow_following_user_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['username', 'id'], name='user_username_id_idx'),
+        ),
+    ]
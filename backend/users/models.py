@@ -5,7 +5,29 @@ from django.db.models import CheckConstraint, F, Q, UniqueConstraint
 from rest_framework import status
 
 
-class User(AbstractUser):
+class DerivedFieldsMixin:
+    # Columns maintained by queryset updates; a plain save() would write
+    # back the stale values loaded with the instance.
+    derived_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.derived_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(DerivedFieldsMixin, AbstractUser):
     email = models.EmailField(
         verbose_name='Почта', max_length=254, unique=True, blank=False
     )
@@ -23,6 +45,14 @@ class User(AbstractUser):
     )
     first_name = models.CharField(verbose_name='Имя', max_length=150)
     last_name = models.CharField(verbose_name='Фамилия', max_length=150)
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков', default=0, editable=False
+    )
+
+    derived_fields = ('recipes_count', 'followers_count')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -31,6 +61,11 @@ class User(AbstractUser):
         ordering = ['username']
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            models.Index(
+                fields=['username', 'id'], name='user_username_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.username
@@ -58,6 +93,11 @@ class Follow(models.Model):
             CheckConstraint(name='not_same', check=~Q(user=F('following'))),
             UniqueConstraint(name='unique_pair', fields=['user', 'following']),
         ]
+        indexes = [
+            models.Index(
+                fields=['following', 'user'], name='follow_following_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} подписан на {self.following}'